@@ -0,0 +1,314 @@
+""" Offline benchmarks of the nlplib hot paths on synthetic corpora.
+
+Usage:
+    python benchmarks/run_benchmarks.py --num-docs 2000 --depth 2 --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --tolerance .2
+
+Each benchmark reports its best wall time over <repeat> runs, its throughput
+(items per second) and its peak traced Python memory (tracemalloc, measured
+on a separate run). Results are written as JSON; with --baseline, benchmarks
+slower than the baseline by more than <tolerance> are reported as
+regressions and the script exits with status 1. Benchmarks whose optional
+dependencies (TensorFlow, NLTK data) are unavailable are skipped.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+benchmarks = {} # Name -> setup(corpus, config) returning (run, num_items)
+
+class SkipBenchmark(Exception):
+    pass
+
+def benchmark(name: str):
+    def register(setup: callable) -> callable:
+        benchmarks[name] = setup
+        return setup
+
+    return register
+
+# Synthetic corpora
+def synthetic_vocabulary(vocabulary_size: int) -> np.ndarray:
+    return np.array([ f"w{idx}" for idx in range(vocabulary_size) ])
+
+def synthetic_text(rng: np.random.Generator, vocabulary: np.ndarray, num_words: int) -> str:
+    # Zipf-distributed words in sentences of up to 12 words.
+    word_idx = np.minimum(rng.zipf(1.3, size=num_words) - 1, vocabulary.size - 1)
+    words = vocabulary[word_idx].tolist()
+
+    for idx in range(11, num_words, 12):
+        words[idx] += "."
+
+    return " ".join(words)
+
+def synthetic_corpus(num_docs: int, depth: int, branching: int, words_per_text: int,
+    vocabulary_size: int = 5000, seed: int = 0) -> list:
+    """ Nested texts, all at <depth>: each sequence below the documents holds
+    between 1 and <branching> subsequences (or texts).
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = synthetic_vocabulary(vocabulary_size)
+
+    def synthetic_sequence(level: int) -> any:
+        if level == depth:
+            return synthetic_text(rng, vocabulary, max(int(rng.poisson(words_per_text)), 1))
+
+        return [ synthetic_sequence(level + 1) for _ in range(int(rng.integers(1, branching + 1))) ]
+
+    return [ synthetic_sequence(1) for _ in range(num_docs) ]
+
+def count_texts(corpus: any) -> int:
+    return 1 if isinstance(corpus, str) else sum(count_texts(sequence) for sequence in corpus)
+
+# Benchmarks
+@benchmark("text.collapse_text_sequences")
+def collapse_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text.utility import collapse_text_sequences
+    return lambda: collapse_text_sequences(corpus), count_texts(corpus)
+
+@benchmark("text.ragged_sequences")
+def ragged_sequences_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text.ragged_sequences import RaggedSequences
+    return lambda: RaggedSequences.from_nested(corpus).to_nested(), count_texts(corpus)
+
+@benchmark("text.cleaning_pipeline")
+def cleaning_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text.cleaning import CleaningPipeline
+
+    cleaning_pipeline = CleaningPipeline(drop_empty=True).to_lowercase() \
+            .remove_regex(r"[^a-z0-9 ]").remove_double_spaces()
+
+    return lambda: cleaning_pipeline(corpus), count_texts(corpus)
+
+@benchmark("text.word_tokenize")
+def word_tokenize_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text.tokenizer import word_tokenize
+    from nlplib.text.nltk_downloads import NltkResourceNotFound
+
+    try:
+        word_tokenize("nlplib")
+    except (NltkResourceNotFound, LookupError) as exception:
+        raise SkipBenchmark(f"NLTK data unavailable: {exception}")
+
+    return lambda: word_tokenize(corpus), count_texts(corpus)
+
+@benchmark("text.window_tokenize")
+def window_tokenize_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text.tokenizer import window_tokenize, drop_token_cond
+    from nlplib.text.nltk_downloads import NltkResourceNotFound
+
+    try:
+        window_tokenize("nlplib", 2)
+    except (NltkResourceNotFound, LookupError) as exception:
+        raise SkipBenchmark(f"NLTK data unavailable: {exception}")
+
+    return lambda: window_tokenize(corpus, 3, drop_window_token_cond=drop_token_cond.punctuation), \
+            count_texts(corpus)
+
+@benchmark("text.extract_n_grams_by_pmi")
+def extract_n_grams_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text.extractor import extract_n_grams_by_pmi
+    from nlplib.text.utility import collapse_text_sequences
+
+    words = [ word for text in collapse_text_sequences(corpus) for word in text.split() ]
+    return lambda: extract_n_grams_by_pmi(words, 3, 100), len(words)
+
+@benchmark("text_encoder.padded_tensor")
+def padded_tensor_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text_encoder.ragged_tensor import padded_tensor
+    return lambda: padded_tensor(corpus, pad_value=''), count_texts(corpus)
+
+def dense_reduction_inputs(corpus: list) -> tuple:
+    from nlplib.text_encoder.ragged_tensor import padded_tensor
+
+    text_tensor = padded_tensor(corpus, pad_value='')
+    weight_tensor = (text_tensor != '').astype(np.float32)
+    encoded_tensor = np.random.default_rng(0).standard_normal(text_tensor.shape).astype(np.float32)
+
+    return encoded_tensor, weight_tensor
+
+@benchmark("text_encoder.numpy_reduction")
+def numpy_reduction_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text_encoder.encoder_reduction.numpy import NumpyReduction
+
+    encoded_tensor, weight_tensor = dense_reduction_inputs(corpus)
+    reduction = NumpyReduction(np.sum)
+
+    return lambda: reduction(encoded_tensor, weight_tensor), encoded_tensor.size
+
+@benchmark("text_encoder.numpy_segment_reduction")
+def numpy_segment_reduction_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text_encoder.ragged_tensor import ragged_segments
+    from nlplib.text_encoder.encoder_reduction.numpy import NumpySegmentReduction
+
+    flat_texts, segment_ids, num_segments = ragged_segments(corpus)
+    values = np.random.default_rng(0).standard_normal(flat_texts.size)
+    weights = np.ones(flat_texts.size)
+    reduction = NumpySegmentReduction("sum")
+
+    return lambda: reduction.reduce_segments(values, weights, segment_ids, num_segments), values.size
+
+@benchmark("text_encoder.tensorflow_reduction")
+def tensorflow_reduction_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    try:
+        import tensorflow as tf
+        from nlplib.text_encoder.encoder_reduction.tensorflow import TensorflowReduction
+    except ImportError as exception:
+        raise SkipBenchmark(f"TensorFlow unavailable: {exception}")
+
+    encoded_tensor, weight_tensor = map(tf.convert_to_tensor, dense_reduction_inputs(corpus))
+    reduction = TensorflowReduction(tf.reduce_sum)
+
+    return lambda: reduction(encoded_tensor, weight_tensor).numpy(), int(tf.size(encoded_tensor))
+
+@benchmark("score.rolling_normalize_window")
+def rolling_normalize_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.score import rolling_normalize_window
+
+    scores = np.random.default_rng(0).standard_normal(config.num_scores)
+    return lambda: rolling_normalize_window(scores, -1, 1, window=config.window,
+            preserve_polarity=True), scores.size
+
+def stub_encoder(**kwargs) -> any:
+    from nlplib.text_encoder.base import BaseTextEncoder
+
+    class StubEncoder (BaseTextEncoder):
+        # Deterministic, model-free scores with a per-text cost similar to tokenization
+        def flat_encode(self, flat_text_tensor: np.ndarray, **kwargs) -> np.ndarray:
+            return np.array([ (len(text.split()) % 7 - 3) / 3 for text in flat_text_tensor ])
+
+    return StubEncoder(**kwargs)
+
+@benchmark("text_encoder.encode")
+def encode_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    text_encoder = stub_encoder()
+    return lambda: text_encoder.encode(corpus), count_texts(corpus)
+
+@benchmark("text_encoder.segment_encode")
+def segment_encode_benchmark(corpus: list, config: argparse.Namespace) -> tuple:
+    from nlplib.text_encoder.encoder_reduction.numpy import NumpySegmentReduction
+
+    text_encoder = stub_encoder(encoder_reduction=NumpySegmentReduction("sum"))
+    return lambda: text_encoder.encode(corpus), count_texts(corpus)
+
+# Runner
+def measure(run: callable, repeat: int) -> dict:
+    run() # Warm-up: imports, caches and compilation
+
+    wall_times = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        run()
+        wall_times.append(time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    run()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return { "wall_time": min(wall_times), "peak_memory": peak_memory }
+
+def run_benchmarks(config: argparse.Namespace) -> dict:
+    corpus = synthetic_corpus(config.num_docs, config.depth, config.branching,
+            config.words_per_text, seed=config.seed)
+
+    results = {}
+
+    for name, setup in benchmarks.items():
+        if config.only and not any(pattern in name for pattern in config.only):
+            continue
+
+        try:
+            run, num_items = setup(corpus, config)
+        except SkipBenchmark as exception:
+            results[name] = { "skipped": str(exception) }
+        except ImportError as exception: # Missing hard dependencies of the module
+            results[name] = { "skipped": f"{type(exception).__name__}: {exception}" }
+        else:
+            result = measure(run, config.repeat)
+            result["num_items"] = num_items
+            result["throughput"] = num_items / result["wall_time"] if result["wall_time"] > 0 else None
+            results[name] = result
+
+        print(format_result(name, results[name]))
+
+    return results
+
+def format_result(name: str, result: dict) -> str:
+    if "skipped" in result:
+        return f"{name:<36} skipped ({result['skipped']})"
+
+    return f"{name:<36} {result['wall_time'] * 1e3:>10.2f} ms {result['throughput'] or 0:>14,.0f} items/s " + \
+            f"{result['peak_memory'] / 2 ** 20:>9.2f} MiB"
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    # Returns the (name, slowdown) of the benchmarks slower than baseline by more than <tolerance>.
+    regressions = []
+
+    for name, result in results.items():
+        baseline_result = baseline.get(name, {})
+
+        if "wall_time" not in result or "wall_time" not in baseline_result:
+            continue
+
+        slowdown = result["wall_time"] / baseline_result["wall_time"] - 1
+
+        if slowdown > tolerance:
+            regressions.append((name, slowdown))
+
+    return regressions
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--num-docs", type=int, default=1000, help="Top-level documents in the corpus.")
+    parser.add_argument("--depth", type=int, default=2, help="Nesting depth of the texts.")
+    parser.add_argument("--branching", type=int, default=4, help="Maximum subsequences per sequence.")
+    parser.add_argument("--words-per-text", type=int, default=20, help="Mean words per text.")
+    parser.add_argument("--num-scores", type=int, default=5000, help="Scores normalized by score benchmarks.")
+    parser.add_argument("--window", type=int, default=250, help="Rolling normalization window.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (best is kept).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="Runs the benchmarks whose name contains any pattern.")
+    parser.add_argument("--output", help="Writes the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compares the results to this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=.2, help="Allowed slowdown over the baseline.")
+
+    return parser.parse_args(argv)
+
+def main(argv: list = None) -> int:
+    config = parse_args(argv)
+    results = run_benchmarks(config)
+
+    if config.output is not None:
+        with open(config.output, 'w', encoding="utf-8") as f:
+            json.dump({
+                "config": { key: value for key, value in vars(config).items()
+                        if key not in ("output", "baseline") },
+                "environment": { "python": platform.python_version(), "numpy": np.__version__,
+                        "platform": platform.platform() },
+                "results": results
+            }, f, indent=2)
+
+    if config.baseline is not None:
+        with open(config.baseline, 'r', encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare_to_baseline(results, baseline, config.tolerance)
+
+        for name, slowdown in regressions:
+            print(f"REGRESSION {name}: {slowdown:+.1%} wall time over baseline")
+
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,6 +21,6 @@ setup(
         "pandas", "nltk", "numpy", "torch",
         "tensorflow", "tensorflow-text==2.8.*",
         "tf-models-official==2.7.0",
-        "transformers", "tqdm"
+        "transformers", "tqdm", "onnxruntime", "tokenizers"
     ]
 )
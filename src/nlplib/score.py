@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from collections import deque
+
 def polarity_preserving(transformer: callable):
     def wrapped_transformer(target_scores: np.ndarray, min_score: float,
         max_score: float, *args, preserve_polarity: bool = False, **kwargs):
@@ -29,21 +31,213 @@ def normalize_scores(target_scores: np.ndarray, min_score: float = 0,
     return min_score + (max_score - min_score) * \
         (target_scores - min_target) / (max_target - min_target)
 
+def rolling_extremum(values: np.ndarray, window: int, extremum: np.ufunc) -> np.ndarray:
+    """ Van Herk/Gil-Werman rolling extremum, in O(n) for any <window>.
+    Args:
+        values (np.ndarray): 1-D values of length n >= <window>.
+        extremum (np.ufunc): A binary extremum, e.g. np.minimum or np.fmin.
+    Returns:
+        rolling_extremum (np.ndarray): The extremum of values[t: t + window] for
+                t in 0 .. n - window.
+    """
+    num_values = values.shape[0]
+    blocks = np.pad(values, (0, -num_values % window), mode="edge").reshape(-1, window)
+
+    # Each window spans the suffix of one block and the prefix of the next.
+    prefix = extremum.accumulate(blocks, axis=1).ravel()
+    suffix = extremum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    return extremum(suffix[:num_values - window + 1], prefix[window - 1:num_values])
+
 @polarity_preserving
 def rolling_normalize_window(target_scores: np.ndarray, min_score: float = 0,
     max_score: float = 1, window: int = None) -> np.ndarray:
+    """ Normalizes each score by the bounds of the trailing <window> scores (along
+    axis 0, over every other axis); the first <window> scores are normalized by
+    the bounds of the first window.
+    Args:
+        target_scores (np.ndarray | pd.Series | pd.DataFrame): The scores, ordered along axis 0.
+        window (int): Defaults to a third of the scores.
+    Returns:
+        normalized_scores (np.ndarray | pd.Series | pd.DataFrame): Same shape and index as <target_scores>.
+    """
     if window is None:
         window = max(target_scores.shape[0] // 3, 1)
 
-    concat = pd.concat if isinstance(target_scores, (pd.Index, pd.Series, pd.DataFrame)) \
-            else np.concatenate
+    assert window > 0, f"""
+            Incompatible window:
+                window = {window} must be positive.
+    """
+
+    if target_scores.shape[0] <= window:
+        return normalize_scores(target_scores, min_score, max_score)
+
+    if isinstance(target_scores, (pd.Series, pd.DataFrame)):
+        # Pandas bounds skip missing scores
+        minimum, maximum = np.fmin, np.fmax
+    else:
+        target_scores = np.asarray(target_scores)
+        minimum, maximum = np.minimum, np.maximum
+
+    flat_scores = np.asarray(target_scores, dtype=float).reshape(target_scores.shape[0], -1)
+    min_targets = rolling_extremum(minimum.reduce(flat_scores, axis=1), window, minimum)
+    max_targets = rolling_extremum(maximum.reduce(flat_scores, axis=1), window, maximum)
+
+    # The first window normalizes every score in it
+    broadcast_shape = (-1,) + (1,) * (target_scores.ndim - 1)
+    min_targets = np.concatenate([ np.repeat(min_targets[:1], window - 1), min_targets ]) \
+            .reshape(broadcast_shape)
+    max_targets = np.concatenate([ np.repeat(max_targets[:1], window - 1), max_targets ]) \
+            .reshape(broadcast_shape)
+
+    return min_score + (max_score - min_score) * \
+        (target_scores - min_targets) / (max_targets - min_targets)
+
+class OnlineScoreNormalizer:
+    """ Streaming <rolling_normalize_window>: scores are added one at a time and
+    normalized by the trailing window bounds, kept in monotonic deques in O(1)
+    amortized time per score.
+
+    The first <window> - 1 scores are buffered until the first window is full.
+    Normalized scores are always emitted in input order; with
+    <preserve_polarity>, positive and negative scores are normalized as
+    separate streams, so a score may wait on the warm-up of its stream.
+    <flush> ends the stream, emitting the buffered scores normalized as in
+    <rolling_normalize_window> for a series shorter than <window>.
+
+    Args:
+        min_score (float): The lower bound of the normalized scores.
+        max_score (float): The upper bound of the normalized scores.
+        window (int): The number of trailing scores bounding each score.
+        preserve_polarity (bool): Whether positive and negative scores are
+                normalized separately into [0, <max_score>] and [<min_score>, 0].
+    """
+    def __init__(self, min_score: float = 0, max_score: float = 1, window: int = 250,
+        preserve_polarity: bool = False) -> None:
+
+        assert window > 0, f"""
+                Incompatible window:
+                    window = {window} must be positive.
+        """
+
+        self.min_score = min_score
+        self.max_score = max_score
+        self.window = window
+        self.preserve_polarity = preserve_polarity
+
+        if preserve_polarity:
+            self.positive_normalizer = OnlineScoreNormalizer(0, max_score, window)
+            self.negative_normalizer = OnlineScoreNormalizer(min_score, 0, window)
+
+        self.reset()
+
+    def reset(self) -> None:
+        self.num_scores = 0
+        self.warm_up_scores = []
+        self.min_deque = deque() # (index, score), increasing scores
+        self.max_deque = deque() # (index, score), decreasing scores
+        self.last_nan_index = -self.window # Missing scores void the bounds of their windows
+
+        if self.preserve_polarity:
+            self.positive_normalizer.reset()
+            self.negative_normalizer.reset()
+
+            self.pending_outputs = deque() # [normalized score or None] of each score, in input order
+            self.positive_outputs = deque()
+            self.negative_outputs = deque()
+
+    def normalize(self, score: np.float64) -> np.float64:
+        if self.last_nan_index > self.num_scores - 1 - self.window:
+            min_target = max_target = np.float64(np.nan)
+        else:
+            min_target = self.min_deque[0][1]
+            max_target = self.max_deque[0][1]
+
+        return self.min_score + (self.max_score - self.min_score) * \
+            (score - min_target) / (max_target - min_target)
+
+    def update(self, score: float) -> np.ndarray:
+        """ Adds the next score.
+        Returns:
+            normalized_scores (np.ndarray): The scores normalized by this update, in input order.
+        """
+        if self.preserve_polarity:
+            return self.update_polarities(score)
+
+        score = np.float64(score)
+        index = self.num_scores
+        self.num_scores += 1
+
+        if np.isnan(score):
+            self.last_nan_index = index
+        else:
+            while self.min_deque and self.min_deque[-1][1] >= score:
+                self.min_deque.pop()
+
+            while self.max_deque and self.max_deque[-1][1] <= score:
+                self.max_deque.pop()
+
+            self.min_deque.append((index, score))
+            self.max_deque.append((index, score))
+
+        for bound_deque in (self.min_deque, self.max_deque):
+            while bound_deque and bound_deque[0][0] <= index - self.window:
+                bound_deque.popleft()
+
+        if index < self.window - 1:
+            self.warm_up_scores.append(score)
+            return np.array([], dtype=float)
+
+        warm_up_scores, self.warm_up_scores = self.warm_up_scores, []
+        return np.array([ self.normalize(target_score) for target_score in [ *warm_up_scores, score ] ])
+
+    def update_polarities(self, score: float) -> np.ndarray:
+        output = [ score if not (score > 0 or score < 0) else None ] # Zeros and NaNs are kept
+        self.pending_outputs.append(output)
+
+        if score > 0:
+            self.positive_outputs.append(output)
+            self.fill_outputs(self.positive_outputs, self.positive_normalizer.update(score))
+        elif score < 0:
+            self.negative_outputs.append(output)
+            self.fill_outputs(self.negative_outputs, self.negative_normalizer.update(score))
+
+        return self.emit_outputs()
+
+    @staticmethod
+    def fill_outputs(outputs: deque, normalized_scores: np.ndarray) -> None:
+        for normalized_score in normalized_scores:
+            outputs.popleft()[0] = normalized_score
+
+    def emit_outputs(self) -> np.ndarray:
+        normalized_scores = []
+
+        while self.pending_outputs and self.pending_outputs[0][0] is not None:
+            normalized_scores.append(self.pending_outputs.popleft()[0])
+
+        return np.array(normalized_scores, dtype=float)
+
+    def update_many(self, scores: np.ndarray) -> np.ndarray:
+        return np.concatenate([ np.array([], dtype=float), *[ self.update(score) for score in scores ] ])
+
+    def flush(self) -> np.ndarray:
+        """ Ends the stream and resets the normalizer.
+        Returns:
+            normalized_scores (np.ndarray): The remaining buffered scores, in input order.
+        """
+        if self.preserve_polarity:
+            self.fill_outputs(self.positive_outputs, self.positive_normalizer.flush())
+            self.fill_outputs(self.negative_outputs, self.negative_normalizer.flush())
+            normalized_scores = self.emit_outputs()
+        elif self.warm_up_scores:
+            # Fewer scores than <window>: normalized together, as in <rolling_normalize_window>
+            normalized_scores = np.asarray(normalize_scores(np.array(self.warm_up_scores),
+                    self.min_score, self.max_score), dtype=float)
+        else:
+            normalized_scores = np.array([], dtype=float)
 
-    return concat([
-        normalize_scores(target_scores[:window], min_score, max_score), *[
-            normalize_scores(target_scores[t: t + window], min_score, max_score)[-1:]
-            for t in range(1, target_scores.shape[0] - window + 1)
-        ]
-    ], axis=0)
+        self.reset()
+        return normalized_scores
 
 if __name__ == "__main__":
     pass
@@ -1,12 +1,18 @@
 import re
 
-from .utility import apply_on_text_sequences    
+from functools import lru_cache, partial
+
+from .utility import apply_on_text_sequences
+from .ragged_sequences import RaggedSequences
 
 def drop_empty_sequences(sequences):
     # Recursively removes subsequences that are empty or None
     if sequences is None or isinstance(sequences, str):
         return sequences
 
+    if isinstance(sequences, RaggedSequences):
+        return sequences.drop_empty()
+
     _sequences = [
         drop_empty_sequences(subsequences)
         for subsequences in sequences
@@ -17,17 +23,85 @@ def drop_empty_sequences(sequences):
         if subsequences
     ]
 
+@lru_cache(maxsize=256)
+def compile_regex(regex: str) -> re.Pattern:
+    return re.compile(regex)
+
 @apply_on_text_sequences
 def to_lowercase(text: str) -> str:
     return text.lower()
 
 @apply_on_text_sequences
 def remove_regex(text: str, regex: str) -> str:
-    return re.sub(regex, '', text)
+    return compile_regex(regex).sub('', text)
 
 @apply_on_text_sequences
 def remove_double_spaces(text: str) -> str:
     return ' '.join(text.split())
 
+class CleaningPipeline:
+    """ Chains text cleaning steps into a single pass over nested text sequences.
+
+    Steps are compiled once when added and applied in order to each text;
+    with <drop_empty>, empty results (and sequences left empty) are removed
+    during the same traversal.
+
+    Example:
+        pipeline = CleaningPipeline(drop_empty=True).to_lowercase() \\
+                .remove_regex(r"[^a-z ]").remove_double_spaces()
+
+        cleaned_sequences = pipeline(text_sequences)
+    """
+    def __init__(self, drop_empty: bool = False) -> None:
+        self.drop_empty = drop_empty
+        self.steps = []
+
+    def add_step(self, method: callable, *args, **kwargs) -> "CleaningPipeline":
+        # <method> maps a single text to its cleaned text.
+        self.steps.append(partial(method, *args, **kwargs) if args or kwargs else method)
+        return self
+
+    def to_lowercase(self) -> "CleaningPipeline":
+        return self.add_step(str.lower)
+
+    def remove_regex(self, regex: str) -> "CleaningPipeline":
+        return self.add_step(compile_regex(regex).sub, '')
+
+    def remove_double_spaces(self) -> "CleaningPipeline":
+        return self.add_step(remove_double_spaces)
+
+    def clean(self, text: str) -> str:
+        for step in self.steps:
+            text = step(text)
+
+        return text
+
+    def clean_sequences(self, text_sequences: any) -> any:
+        if text_sequences is None:
+            return text_sequences
+
+        if isinstance(text_sequences, str):
+            return self.clean(text_sequences)
+
+        if not self.drop_empty:
+            return [ self.clean_sequences(text_subsequences) for text_subsequences in text_sequences ]
+
+        cleaned_sequences = []
+
+        for text_subsequences in text_sequences:
+            text_subsequences = self.clean_sequences(text_subsequences)
+
+            if text_subsequences:
+                cleaned_sequences.append(text_subsequences)
+
+        return cleaned_sequences
+
+    def __call__(self, text_sequences: any) -> any:
+        if isinstance(text_sequences, RaggedSequences):
+            text_sequences = text_sequences.map(self.clean_sequences)
+            return text_sequences.drop_empty() if self.drop_empty else text_sequences
+
+        return self.clean_sequences(text_sequences)
+
 if __name__ == "__main__":
     pass
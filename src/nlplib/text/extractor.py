@@ -1,8 +1,15 @@
+import os
+import copy
+
+from itertools import islice
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from nltk.probability import FreqDist
 from nltk.collocations import BigramAssocMeasures, BigramCollocationFinder
 from nltk.collocations import TrigramAssocMeasures, TrigramCollocationFinder
 from nltk.collocations import QuadgramAssocMeasures, QuadgramCollocationFinder
 
-from .utility import collapse_text_sequences
+from .utility import collapse_text_sequences, iter_text_sequences
 
 map_n_gram = {
     2: (BigramAssocMeasures,   BigramCollocationFinder),
@@ -10,18 +17,149 @@ map_n_gram = {
     4: (QuadgramAssocMeasures, QuadgramCollocationFinder)
 }
 
-def extract_n_grams_by_pmi(text: str, n: int, extract_m: int, min_freq: int = 3):
+DEFAULT_SHARD_SIZE = 100_000
+
+class NGramCounts:
+    """ Mergeable n-gram counts of a <*CollocationFinder>.
+
+    The finder counts are sums over word windows, so a corpus can be counted
+    in shards and merged: each shard counts the windows that start in its
+    words, given the <n> - 1 words that follow it as lookahead.
+
+    Args:
+        n (int): The n-gram size, between 2 and 4.
+    """
+    def __init__(self, n: int) -> None:
+        assert n in map_n_gram
+        self.n = n
+        self.collocation_finder = None
+
+    def freq_dists(self) -> dict:
+        if self.collocation_finder is None:
+            return {}
+
+        return {
+            attr: freq_dist for attr, freq_dist in vars(self.collocation_finder).items()
+            if isinstance(freq_dist, FreqDist)
+        }
+
+    def update(self, words: list, lookahead: list = ()) -> "NGramCounts":
+        # Counts the windows starting in <words>; <lookahead> are the words following them.
+        _, collocation_finder_type = map_n_gram[self.n]
+
+        counts = NGramCounts(self.n)
+        counts.collocation_finder = collocation_finder_type.from_words([ *words, *lookahead ])
+
+        if lookahead: # Windows starting in the lookahead are counted by the next shard
+            lookahead_counts = NGramCounts(self.n)
+            lookahead_counts.collocation_finder = collocation_finder_type.from_words(lookahead)
+            counts.subtract(lookahead_counts)
+
+        return self.merge(counts)
+
+    def merge(self, other: "NGramCounts") -> "NGramCounts":
+        assert self.n == other.n, f"Cannot merge {other.n}-gram counts into {self.n}-gram counts."
+
+        if self.collocation_finder is None:
+            self.collocation_finder = other.collocation_finder
+            return self
+
+        freq_dists = self.freq_dists()
+
+        for attr, freq_dist in other.freq_dists().items():
+            freq_dists[attr].update(freq_dist)
+
+        self.collocation_finder.N = self.collocation_finder.word_fd.N()
+        return self
+
+    def subtract(self, other: "NGramCounts") -> "NGramCounts":
+        other_freq_dists = other.freq_dists()
+
+        for attr, freq_dist in self.freq_dists().items():
+            freq_dist.subtract(other_freq_dists[attr])
+
+            for key in [ key for key, count in freq_dist.items() if count <= 0 ]:
+                del freq_dist[key]
+
+        self.collocation_finder.N = self.collocation_finder.word_fd.N()
+        return self
+
+    def nbest_by_pmi(self, extract_m: int, min_freq: int = 3) -> list:
+        measures_type, collocation_finder_type = map_n_gram[self.n]
+        # The frequency filter replaces <ngram_fd>, leaving the merged counts intact
+        collocation_finder = copy.copy(self.collocation_finder) \
+                if self.collocation_finder is not None \
+                else collocation_finder_type.from_words([])
+
+        collocation_finder.apply_freq_filter(min_freq)
+        return collocation_finder.nbest(measures_type().pmi, extract_m)
+
+def iter_word_shards(words: Iterable, shard_size: int, lookahead_size: int) -> Iterator:
+    # Yields consecutive (shard, lookahead) pairs covering <words>.
+    words = iter(words)
+    buffer = list(islice(words, shard_size + lookahead_size))
+
+    while len(buffer) == shard_size + lookahead_size:
+        yield buffer[:shard_size], buffer[shard_size:]
+        buffer = buffer[shard_size:] + list(islice(words, shard_size))
+
+    yield buffer, []
+
+def count_word_shard(n: int, words: list, lookahead: list) -> NGramCounts:
+    return NGramCounts(n).update(words, lookahead)
+
+def count_n_grams(text_sequences: any, n: int, shard_size: int = None,
+    n_workers: int = None) -> NGramCounts:
+    """ Counts the n-grams of the flattened <text_sequences> shard by shard.
+    Args:
+        text_sequences (any): The (nested) words to count.
+        n (int): The n-gram size, between 2 and 4.
+        shard_size (int): The number of words per shard; when un-specified,
+                counts the whole corpus at once unless <n_workers> is set.
+        n_workers (int): When specified, counts shards in parallel on a
+                process pool of <n_workers> processes.
+    Returns:
+        counts (NGramCounts): The merged counts.
+    """
+    counts = NGramCounts(n)
+
+    if shard_size is None and n_workers is None:
+        return counts.update(collapse_text_sequences(text_sequences))
+
+    word_shards = iter_word_shards(iter_text_sequences(text_sequences),
+            shard_size or DEFAULT_SHARD_SIZE, n - 1)
+
+    if n_workers is None:
+        for words, lookahead in word_shards:
+            counts.update(words, lookahead)
+
+        return counts
+
+    n_workers = n_workers or os.cpu_count()
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        pending = set()
+
+        for words, lookahead in word_shards:
+            if len(pending) >= 2 * n_workers: # Bounds the shards held in memory
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    counts.merge(future.result())
+
+            pending.add(executor.submit(count_word_shard, n, words, lookahead))
+
+        for future in pending:
+            counts.merge(future.result())
+
+    return counts
+
+def extract_n_grams_by_pmi(text: str, n: int, extract_m: int, min_freq: int = 3,
+    shard_size: int = None, n_workers: int = None):
     # supports up to quad-grams
     assert n in map_n_gram
-    measures_type, collocation_finder_type = map_n_gram[n]
-    
-    measures = measures_type()
-    collocation_finder = collocation_finder_type.from_words(
-        collapse_text_sequences(text)
-    )
-
-    collocation_finder.apply_freq_filter(min_freq)
-    return collocation_finder.nbest(measures.pmi, extract_m)
+
+    return count_n_grams(text, n, shard_size, n_workers).nbest_by_pmi(extract_m, min_freq)
 
 if __name__ == "__main__":
     pass
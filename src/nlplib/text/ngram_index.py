@@ -0,0 +1,148 @@
+import os
+import json
+import numpy as np
+
+from collections import Counter
+from itertools import islice
+
+from .extractor import map_n_gram
+from .tokenizer import TokenVocabulary
+from .utility import iter_text_sequences
+
+class NGramCountIndex:
+    """ Contiguous n-gram counts of a corpus, built once and queried for PMI
+    collocations without recounting.
+
+    The index stores the vocabulary, the unigram counts and, for each order,
+    an (num_ngrams, n) array of token ids with their counts. Saved indexes are
+    plain .npy files that are memory-mapped on load.
+
+    Args:
+        vocabulary (list): The tokens, indexed by token id.
+        unigram_counts (np.ndarray): The count of each token.
+        ngram_ids (dict): n -> (num_ngrams, n) array of token ids.
+        ngram_counts (dict): n -> (num_ngrams, ) array of n-gram counts.
+    """
+    def __init__(self, vocabulary: list, unigram_counts: np.ndarray, ngram_ids: dict,
+        ngram_counts: dict) -> None:
+
+        self.vocabulary = vocabulary
+        self.unigram_counts = unigram_counts
+        self.ngram_ids = ngram_ids
+        self.ngram_counts = ngram_counts
+
+    @property
+    def num_words(self) -> int:
+        return int(self.unigram_counts.sum())
+
+    @classmethod
+    def build(cls, text_sequences: any, orders: tuple = (2, 3, 4),
+        chunk_size: int = 1_000_000) -> "NGramCountIndex":
+        """ Counts the n-grams of the flattened <text_sequences> in a single pass.
+        Args:
+            text_sequences (any): The (nested) words to index.
+            orders (tuple): The n-gram sizes to index, between 2 and 4.
+            chunk_size (int): The number of words interned and counted at a time.
+        Returns:
+            index (NGramCountIndex): The in-memory index.
+        """
+        assert all(n in map_n_gram for n in orders)
+
+        vocabulary = TokenVocabulary()
+        unigram_counts = np.zeros(0, dtype=np.int64)
+        ngram_counters = { n: Counter() for n in orders }
+
+        words = iter_text_sequences(text_sequences)
+        carry = [] # The last max(orders) - 1 ids of the previous chunk
+
+        while True:
+            chunk_ids = vocabulary.intern_tokens(islice(words, chunk_size))
+
+            if not chunk_ids:
+                break
+
+            chunk_counts = np.bincount(chunk_ids, minlength=len(vocabulary))
+            chunk_counts[:unigram_counts.size] += unigram_counts
+            unigram_counts = chunk_counts
+
+            token_ids = carry + chunk_ids
+
+            for n, ngram_counter in ngram_counters.items():
+                # n-grams lying entirely within <carry> were counted with the previous chunk
+                skip = max(len(carry) - n + 1, 0)
+                ngram_counter.update(zip(*(token_ids[skip + t:] for t in range(n))))
+
+            carry = token_ids[max(len(token_ids) - max(orders) + 1, 0):]
+
+        ngram_ids, ngram_counts = {}, {}
+
+        for n, ngram_counter in ngram_counters.items():
+            ngram_ids[n] = np.array(list(ngram_counter.keys()), dtype=np.int32).reshape(-1, n)
+            ngram_counts[n] = np.fromiter(ngram_counter.values(), dtype=np.int64,
+                    count=len(ngram_counter))
+
+        return cls(vocabulary.tokens, unigram_counts, ngram_ids, ngram_counts)
+
+    def save(self, dpath: str) -> None:
+        os.makedirs(dpath, exist_ok=True)
+
+        with open(os.path.join(dpath, "vocabulary.json"), 'w', encoding="utf-8") as f:
+            json.dump(self.vocabulary, f)
+
+        np.save(os.path.join(dpath, "unigram_counts.npy"), self.unigram_counts)
+
+        for n in self.ngram_ids:
+            np.save(os.path.join(dpath, f"{n}gram_ids.npy"), self.ngram_ids[n])
+            np.save(os.path.join(dpath, f"{n}gram_counts.npy"), self.ngram_counts[n])
+
+    @classmethod
+    def load(cls, dpath: str, mmap_mode: str = 'r') -> "NGramCountIndex":
+        with open(os.path.join(dpath, "vocabulary.json"), 'r', encoding="utf-8") as f:
+            vocabulary = json.load(f)
+
+        load = lambda fname: np.load(os.path.join(dpath, fname), mmap_mode=mmap_mode)
+        orders = [ n for n in map_n_gram if os.path.exists(os.path.join(dpath, f"{n}gram_ids.npy")) ]
+
+        return cls(
+            vocabulary, load("unigram_counts.npy"),
+            { n: load(f"{n}gram_ids.npy") for n in orders },
+            { n: load(f"{n}gram_counts.npy") for n in orders }
+        )
+
+    def nbest_by_pmi(self, n: int, extract_m: int, min_freq: int = 3) -> list:
+        """ Returns the same top <extract_m> n-grams as <extract_n_grams_by_pmi>
+        over the indexed corpus.
+        """
+        assert n in self.ngram_ids, f"{n}-grams are not indexed, must be in {[*self.ngram_ids]}."
+        measures = map_n_gram[n][0]()
+        num_words = self.num_words
+
+        ngram_counts = np.asarray(self.ngram_counts[n])
+        candidates = np.flatnonzero(ngram_counts >= min_freq)
+        ngram_ids = np.asarray(self.ngram_ids[n])[candidates]
+        ngram_counts = ngram_counts[candidates]
+
+        if extract_m is not None and 0 < extract_m < candidates.size:
+            # Approximate scores select the candidates; ties at the cut-off are kept
+            # and rescored exactly below.
+            approx_scores = np.log2(ngram_counts) + (n - 1) * np.log2(num_words) \
+                    - np.log2(self.unigram_counts[ngram_ids]).sum(axis=1)
+
+            cutoff = np.partition(approx_scores, candidates.size - extract_m)[candidates.size - extract_m]
+            selected = approx_scores >= cutoff - 1e-9 * max(1., abs(cutoff))
+            ngram_ids, ngram_counts = ngram_ids[selected], ngram_counts[selected]
+
+        scored_ngrams = []
+
+        for token_ids, ngram_count in zip(ngram_ids.tolist(), ngram_counts.tolist()):
+            scored_ngrams.append((
+                tuple(self.vocabulary[token_id] for token_id in token_ids),
+                measures.pmi(ngram_count, *[()] * (n - 2),
+                        tuple(self.unigram_counts[token_ids].tolist()), num_words)
+            ))
+
+        scored_ngrams.sort(key=lambda scored_ngram: (-scored_ngram[1], scored_ngram[0]))
+        return [ ngram for ngram, _ in scored_ngrams[:extract_m] ]
+
+if __name__ == "__main__":
+    pass
@@ -1,7 +1,66 @@
 import nltk
 
-nltk.download("punkt")
-nltk.download("stopwords")
+from collections.abc import Iterable
+from nltk.tokenize import punkt
+
+# Resource id -> path searched for under the NLTK data directories
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab/english/",
+    "stopwords": "corpora/stopwords",
+}
+
+# The punkt models read by <nltk.word_tokenize>: NLTK >= 3.8.2 loads punkt_tab
+# (via PunktTokenizer), older releases the pickled punkt.
+PUNKT_RESOURCE = "punkt_tab" if hasattr(punkt, "PunktTokenizer") else "punkt"
+
+nltk_data_dpath = None
+resolved_resources = set()
+
+class NltkResourceNotFound(LookupError):
+    def __init__(self, resource_name: str) -> None:
+        super().__init__(
+            f"NLTK resource {resource_name} not found in {nltk.data.path}.\n" + \
+            "Run nlplib.text.nltk_downloads.provision_nltk_resources() once " + \
+            "on a host with network access, or point set_nltk_data_dpath() " + \
+            "to a provisioned directory."
+        )
+
+def set_nltk_data_dpath(dpath: str) -> None:
+    # Searches <dpath> first for NLTK resources; no network access is made.
+    global nltk_data_dpath
+
+    nltk_data_dpath = dpath
+    resolved_resources.clear()
+
+    if dpath not in nltk.data.path:
+        nltk.data.path.insert(0, dpath)
+
+def require_nltk_resource(resource_name: str) -> None:
+    # Resolves <resource_name> locally on first use; later calls are a set lookup.
+    if resource_name in resolved_resources:
+        return
+
+    try:
+        nltk.data.find(NLTK_RESOURCES.get(resource_name, resource_name))
+    except LookupError:
+        raise NltkResourceNotFound(resource_name) from None
+
+    resolved_resources.add(resource_name)
+
+def provision_nltk_resources(resource_names: Iterable = NLTK_RESOURCES, dpath: str = None,
+    quiet: bool = True) -> None:
+    """ Downloads <resource_names> into <dpath> (or the configured NLTK data
+    directory). Only this function accesses the network.
+    """
+    if dpath is not None:
+        set_nltk_data_dpath(dpath)
+
+    for resource_name in resource_names:
+        nltk.download(resource_name, download_dir=nltk_data_dpath, quiet=quiet,
+                raise_on_error=True)
+
+    resolved_resources.clear()
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,101 @@
+import os
+
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+
+from . import nltk_downloads
+from .ragged_sequences import RaggedSequences
+from .tokenizer import load_nltk_resources
+from .nltk_downloads import NltkResourceNotFound, set_nltk_data_dpath
+
+def chunk_text_sequences(text_sequences: any, chunk_size: int) -> list:
+    # Splits the top-level sequences of <text_sequences> into consecutive chunks.
+    return [
+        text_sequences[frm_idx:frm_idx + chunk_size]
+        for frm_idx in range(0, len(text_sequences), chunk_size)
+    ]
+
+def join_text_sequences(chunks: list) -> any:
+    # Inverse of <chunk_text_sequences>.
+    if chunks and isinstance(chunks[0], RaggedSequences):
+        return RaggedSequences.concat(chunks)
+
+    return list(chain.from_iterable(chunks))
+
+def init_worker(nltk_data_dpath: str, initializer: callable) -> None:
+    # Searches the parent's NLTK data directory; a missing resource is left to the
+    # tasks that require it, so pools without NLTK data still serve other methods.
+    if nltk_data_dpath is not None:
+        set_nltk_data_dpath(nltk_data_dpath)
+
+    if initializer is not None:
+        try:
+            initializer()
+        except NltkResourceNotFound:
+            pass
+
+def apply_on_chunk(method: callable, chunk: any, args: tuple, kwargs: dict) -> any:
+    return method(chunk, *args, **kwargs)
+
+class TextProcessPool:
+    """ Process pool sharding top-level text sequences across worker processes.
+
+    <method> is any picklable function of text sequences, such as
+    <word_tokenize>, <window_tokenize> or a <CleaningPipeline>. Chunks of
+    <chunk_size> top-level sequences are processed in parallel and their
+    results are joined back in order.
+
+    Args:
+        n_workers (int): The number of worker processes, defaults to os.cpu_count().
+        chunk_size (int): The number of top-level sequences per task.
+        initializer (callable): Called once in each worker before any task;
+                defaults to loading the NLTK resources. Missing NLTK resources
+                are skipped, and raised by the tasks requiring them.
+
+    Workers search the NLTK data directory of <set_nltk_data_dpath>, as set
+    in the parent process when the pool is created.
+
+    Example:
+        with TextProcessPool(n_workers=32) as pool:
+            token_sequences = pool.apply(word_tokenize, text_sequences,
+                    drop_token_cond=drop_token_cond.stopword)
+    """
+    def __init__(self, n_workers: int = None, chunk_size: int = 1024,
+        initializer: callable = load_nltk_resources) -> None:
+
+        self.n_workers = n_workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(max_workers=self.n_workers, initializer=init_worker,
+                initargs=(nltk_downloads.nltk_data_dpath, initializer))
+
+    def apply(self, method: callable, text_sequences: any, *args, chunk_size: int = None,
+        **kwargs) -> any:
+
+        if isinstance(text_sequences, str):
+            return method(text_sequences, *args, **kwargs)
+
+        chunks = chunk_text_sequences(text_sequences, chunk_size or self.chunk_size)
+        num_chunks = len(chunks)
+
+        return join_text_sequences(list(self.executor.map(
+            apply_on_chunk, [method] * num_chunks, chunks,
+            [args] * num_chunks, [kwargs] * num_chunks
+        )))
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def __enter__(self) -> "TextProcessPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def parallel_apply(method: callable, text_sequences: any, *args, n_workers: int = None,
+    chunk_size: int = 1024, **kwargs) -> any:
+    # One-off <TextProcessPool.apply>; reuse a pool across calls to avoid start-up costs.
+    with TextProcessPool(n_workers, chunk_size) as pool:
+        return pool.apply(method, text_sequences, *args, **kwargs)
+
+if __name__ == "__main__":
+    pass
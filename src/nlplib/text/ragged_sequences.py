@@ -0,0 +1,185 @@
+import inspect
+import numpy as np
+
+from collections.abc import Iterable
+
+class RaggedSequences:
+    """ Nested text sequences stored as one flat list of values and one
+    offsets array per nesting level.
+
+    <offsets[k]> holds the row splits of level k: the children of the i-th
+    node at level k are the nodes (or values, for the last level) in
+    [offsets[k][i], offsets[k][i + 1]). The root level has a single node.
+
+    Args:
+        values (list): The flattened leaf values.
+        offsets (list): The per-level row splits, outermost first.
+    """
+    def __init__(self, values: list, offsets: list) -> None:
+        self.values = values
+        self.offsets = [ np.asarray(level_offsets, dtype=np.int64) for level_offsets in offsets ]
+
+    @classmethod
+    def from_nested(cls, text_sequences: Iterable) -> "RaggedSequences":
+        """ Builds the container from uniformly nested lists in O(n).
+        Args:
+            text_sequences (Iterable): Nested sequences whose leaves (str or
+                    None) all sit at the same depth.
+        Returns:
+            ragged_sequences (RaggedSequences): The flattened sequences.
+        """
+        if isinstance(text_sequences, str) or text_sequences is None:
+            raise TypeError("<text_sequences> must be a nested sequence, not a leaf.")
+
+        offsets = []
+        nodes = [ text_sequences ]
+
+        while True:
+            offsets.append(np.cumsum([ 0, *map(len, nodes) ], dtype=np.int64))
+            nodes = [ child for node in nodes for child in node ]
+            num_leaves = sum(isinstance(node, str) or node is None for node in nodes)
+
+            if num_leaves == len(nodes):
+                return cls(nodes, offsets)
+
+            if num_leaves:
+                raise ValueError("<text_sequences> must be nested to a uniform depth.")
+
+    def to_nested(self) -> list:
+        # Rebuilds the nested lists, innermost level first.
+        nodes = self.values
+
+        for level_offsets in reversed(self.offsets):
+            nodes = [
+                nodes[frm_idx:to_idx]
+                for frm_idx, to_idx in zip(level_offsets[:-1], level_offsets[1:])
+            ]
+
+        return nodes[0]
+
+    @property
+    def depth(self) -> int:
+        return len(self.offsets)
+
+    def __len__(self) -> int:
+        return int(self.offsets[0][-1])
+
+    def __getitem__(self, key: slice) -> "RaggedSequences":
+        # Slices the top-level sequences, sharing no offsets with <self>.
+        if not isinstance(key, slice):
+            raise TypeError(f"{type(self).__name__} only supports slicing, not {type(key).__name__}.")
+
+        frm_idx, to_idx, step = key.indices(len(self))
+        assert step == 1, "RaggedSequences slices must be contiguous."
+
+        to_idx = max(frm_idx, to_idx)
+        offsets = [ np.array([ 0, to_idx - frm_idx ], dtype=np.int64) ]
+
+        for level_offsets in self.offsets[1:]:
+            level_offsets = level_offsets[frm_idx:to_idx + 1]
+            offsets.append(level_offsets - level_offsets[0])
+            frm_idx, to_idx = level_offsets[0], level_offsets[-1]
+
+        return type(self)(self.values[frm_idx:to_idx], offsets)
+
+    @classmethod
+    def concat(cls, ragged_sequences: list) -> "RaggedSequences":
+        # Concatenates the top-level sequences of equally deep <ragged_sequences>.
+        # Chunks without leaves (e.g. mapped empty chunks) take the depth of the others
+        depth = max(sequences.depth for sequences in ragged_sequences)
+        ragged_sequences = [
+            sequences if sequences.values or sequences.depth == depth else sequences.deepen(depth)
+            for sequences in ragged_sequences
+        ]
+
+        assert all(sequences.depth == depth for sequences in ragged_sequences), \
+                "Cannot concatenate RaggedSequences of different depths."
+
+        offsets = [ np.array([ 0, sum(map(len, ragged_sequences)) ], dtype=np.int64) ]
+
+        for level in range(1, depth):
+            level_offsets = [ np.zeros(1, dtype=np.int64) ]
+            base_offset = 0 # Chunks may hold no nodes at this level
+
+            for sequences in ragged_sequences:
+                sequences_offsets = sequences.offsets[level]
+                level_offsets.append(sequences_offsets[1:] - sequences_offsets[0] + base_offset)
+                base_offset += int(sequences_offsets[-1] - sequences_offsets[0])
+
+            offsets.append(np.concatenate(level_offsets))
+
+        return cls([ value for sequences in ragged_sequences for value in sequences.values ], offsets)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(depth={self.depth}, len={len(self)}, values={len(self.values)})"
+
+    def with_values(self, values: list) -> "RaggedSequences":
+        # Returns the same nesting with <values> as leaves; offsets are shared.
+        assert len(values) == len(self.values), f"""
+            Incompatible Values:
+            Cannot replace {len(self.values)} leaves with {len(values)} values.
+        """
+
+        return type(self)(values, self.offsets)
+
+    def map(self, method: callable, *args, **kwargs) -> "RaggedSequences":
+        """ Applies <method> to every leaf.
+        When <method> returns lists, the results are expanded into a new
+        innermost level instead of being kept as leaves; other results in
+        that level become single items, or no items for None. Without
+        leaves, a level is added when <method> is annotated to return a list.
+        """
+        values = [ method(value, *args, **kwargs) for value in self.values ]
+
+        if not (any(isinstance(value, list) for value in values) if values else returns_list(method)):
+            return self.with_values(values)
+
+        values = [
+            value if isinstance(value, list) else [] if value is None else [ value ]
+            for value in values
+        ]
+
+        return type(self)(
+            [ item for value in values for item in value ],
+            [ *self.offsets, np.cumsum([ 0, *map(len, values) ], dtype=np.int64) ]
+        )
+
+    def deepen(self, depth: int) -> "RaggedSequences":
+        # Adds empty innermost levels to sequences without leaves, e.g. an empty chunk.
+        assert not self.values or depth == self.depth, \
+                "Only RaggedSequences without leaves can be deepened."
+
+        return type(self)(self.values, [
+            *self.offsets, *[ np.zeros(1, dtype=np.int64) ] * (depth - self.depth)
+        ])
+
+    def drop_empty(self) -> "RaggedSequences":
+        # Removes empty or None leaves, then any node left without children.
+        keep = np.fromiter((bool(value) for value in self.values), dtype=bool,
+                count=len(self.values))
+
+        values = [ value for value, keep_value in zip(self.values, keep) if keep_value ]
+        offsets = []
+
+        for level, level_offsets in reversed([ *enumerate(self.offsets) ]):
+            level_offsets = np.concatenate([ [0], np.cumsum(keep, dtype=np.int64) ])[level_offsets]
+            keep = np.diff(level_offsets) > 0
+
+            if level: # The root node is always kept
+                level_offsets = np.concatenate([ level_offsets[:1], level_offsets[1:][keep] ])
+
+            offsets.append(level_offsets)
+
+        return type(self)(values, offsets[::-1])
+
+def returns_list(method: callable) -> bool:
+    # Whether <method> is annotated to return a list.
+    try:
+        return_annotation = inspect.signature(method).return_annotation
+    except (TypeError, ValueError):
+        return False
+
+    return return_annotation in (list, "list") or getattr(return_annotation, "__origin__", None) is list
+
+if __name__ == "__main__":
+    pass
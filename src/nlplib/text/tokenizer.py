@@ -1,63 +1,233 @@
 import re
 import string
-import operator
 
-from functools import reduce
+from functools import lru_cache
+from collections.abc import Iterable, Iterator
 from nltk import tokenize
 from nltk.corpus import stopwords
 
-from .utility import apply_on_text_sequences
-from .nltk_downloads import *
+from .utility import apply_on_text_sequences, iter_text_sequences
+from .nltk_downloads import PUNKT_RESOURCE, require_nltk_resource
 from pyutils.regex import SINGLE_CHAR_ONLY
 
+@lru_cache(maxsize=None)
+def stopword_set(language: str = "english") -> frozenset:
+    require_nltk_resource("stopwords")
+    return frozenset(stopwords.words(language))
+
+@lru_cache(maxsize=None)
+def punctuation_set() -> frozenset:
+    # <token in string.punctuation> is a substring test: every contiguous
+    # substring of string.punctuation (including '') is a match.
+    return frozenset(
+        string.punctuation[frm_idx:to_idx]
+        for frm_idx in range(len(string.punctuation) + 1)
+        for to_idx in range(frm_idx, len(string.punctuation) + 1)
+    )
+
+def load_nltk_resources() -> None:
+    # Loads the stopwords and punkt models into memory, e.g. once per worker process.
+    stopword_set()
+    require_nltk_resource(PUNKT_RESOURCE)
+    tokenize.word_tokenize("nlplib")
+
 class drop_token_cond:
     def single_char_only(token: str) -> bool:
         return not (re.match(SINGLE_CHAR_ONLY, token) is None)
 
     def punctuation(token: str) -> bool:
-        return token in string.punctuation
+        return token in punctuation_set()
 
     def stopword(token: str) -> bool:
-        return token in stopwords.words("english")
+        return token in stopword_set()
 
     def empty(token: str) -> bool:
         return token == ''
 
     def disjoint_drop_token_cond(*drop_token_conds: callable) -> callable:
-        return lambda token: reduce(operator.or_, [
-            drop_token_cond(token) for drop_token_cond in drop_token_conds
-        ])
+        return TokenFilter(*drop_token_conds)
+
+class TokenFilter:
+    """ Compiled disjunction of drop token conditions.
+
+    Known <drop_token_cond> members are merged into a single frozenset of
+    dropped tokens and a single compiled regex; any other callable is kept
+    as a fallback predicate. Conditions are checked cheapest first and the
+    check short-circuits on the first match.
+
+    Args:
+        drop_token_conds (callable): Conditions to merge, either members of
+                <drop_token_cond>, other <TokenFilter>s or arbitrary predicates.
+        drop_tokens (Iterable): Additional tokens to drop.
+        drop_regexes (Iterable): Additional patterns to drop on match.
+    """
+    compiled_conds = {
+        drop_token_cond.punctuation: lambda: (punctuation_set(), ()),
+        drop_token_cond.stopword:    lambda: (stopword_set(), ()),
+        drop_token_cond.empty:       lambda: (frozenset(['']), ()),
+        drop_token_cond.single_char_only: lambda: (frozenset(), (SINGLE_CHAR_ONLY, )),
+    }
+
+    def __init__(self, *drop_token_conds: callable, drop_tokens: Iterable = (),
+        drop_regexes: Iterable = ()) -> None:
+
+        drop_tokens = set(drop_tokens)
+        drop_regexes = list(drop_regexes)
+        drop_predicates = []
+
+        for cond in drop_token_conds:
+            if isinstance(cond, TokenFilter):
+                drop_tokens.update(cond.drop_tokens)
+                drop_regexes.extend(cond.drop_regexes)
+                drop_predicates.extend(cond.drop_predicates)
+            elif cond in TokenFilter.compiled_conds:
+                cond_tokens, cond_regexes = TokenFilter.compiled_conds[cond]()
+                drop_tokens.update(cond_tokens)
+                drop_regexes.extend(cond_regexes)
+            else:
+                drop_predicates.append(cond)
+
+        self.drop_tokens = frozenset(drop_tokens)
+        self.drop_regexes = tuple(dict.fromkeys(drop_regexes))
+        self.drop_predicates = tuple(dict.fromkeys(drop_predicates))
+
+        if not self.drop_regexes:
+            self.drop_match = None
+        elif len(self.drop_regexes) == 1:
+            self.drop_match = re.compile(self.drop_regexes[0]).match
+        else:
+            self.drop_match = re.compile('|'.join(
+                f"(?:{drop_regex})" for drop_regex in self.drop_regexes
+            )).match
+
+    def __call__(self, token: str) -> bool:
+        return token in self.drop_tokens \
+                or (self.drop_match is not None and self.drop_match(token) is not None) \
+                or any(predicate(token) for predicate in self.drop_predicates)
+
+    def filter(self, token_list: Iterable) -> list:
+        # Returns the tokens in <token_list> that are not dropped.
+        drop_tokens = self.drop_tokens
+        token_list = [ token for token in token_list if token not in drop_tokens ]
+
+        if self.drop_match is not None:
+            drop_match = self.drop_match
+            token_list = [ token for token in token_list if drop_match(token) is None ]
+
+        for predicate in self.drop_predicates:
+            token_list = [ token for token in token_list if not predicate(token) ]
+
+        return token_list
+
+@lru_cache(maxsize=256)
+def compile_drop_token_cond(drop_token_cond: callable) -> TokenFilter:
+    if isinstance(drop_token_cond, TokenFilter):
+        return drop_token_cond
+
+    return TokenFilter(drop_token_cond)
 
 def drop_tokens_by_cond(token_list: list, drop_token_cond: callable):
-    return [
-        token for token in token_list
-        if not drop_token_cond(token)
-    ]
+    return compile_drop_token_cond(drop_token_cond).filter(token_list)
 
 @apply_on_text_sequences
 def word_tokenize(text: str, drop_token_cond: callable = drop_token_cond.empty) -> list:
+    require_nltk_resource(PUNKT_RESOURCE)
     return drop_tokens_by_cond(tokenize.word_tokenize(text), drop_token_cond)
 
-@apply_on_text_sequences
-def window_tokenize(text: str, spans: int, drop_token_cond: callable = drop_token_cond.empty,
-    drop_window_token_cond: callable = drop_token_cond.empty, delimiter: str = ' ') -> list:
-
+class TokenVocabulary:
+    """ Interns tokens to contiguous integer ids.
+    """
+    def __init__(self, tokens: Iterable = ()) -> None:
+        self.token_ids = {}
+        self.tokens = []
+        self.intern_tokens(tokens)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self.token_ids
+
+    def intern(self, token: str) -> int:
+        token_id = self.token_ids.get(token)
+
+        if token_id is None:
+            token_id = self.token_ids[token] = len(self.tokens)
+            self.tokens.append(token)
+
+        return token_id
+
+    def intern_tokens(self, token_list: Iterable) -> list:
+        return [ self.intern(token) for token in token_list ]
+
+    def decode(self, token_ids: Iterable) -> tuple:
+        return tuple(self.tokens[token_id] for token_id in token_ids)
+
+def iter_window_tokens(token_list: list, spans: int, drop_window_token_cond: callable = drop_token_cond.empty,
+    delimiter: str = ' ', vocabulary: TokenVocabulary = None) -> Iterator:
+    """ Lazily yields the windows of <token_list> for each span in <spans>.
+    Args:
+        token_list (list): The tokens to window over.
+        spans (int | Iterable): The window spans; an int is read as range(spans).
+        drop_window_token_cond (callable): Windows (joined by <delimiter>)
+                satisfying this condition are skipped.
+        delimiter (str): The separator used to join window tokens.
+        vocabulary (TokenVocabulary): When specified, yields tuples of token
+                ids interned in <vocabulary> instead of joined strings.
+    Yields:
+        window (str | tuple): The next window, ordered by span then position.
+    """
     if isinstance(spans, int):
         spans = range(spans)
 
-    token_list = word_tokenize(text, drop_token_cond)
+    drop_window = compile_drop_token_cond(drop_window_token_cond)
     num_tokens = len(token_list)
 
-    window_token_list = reduce(
-        operator.add, [
-            [
-                delimiter.join(token_list[t:t + span])
-                for t in range(num_tokens - span + 1)
-            ] for span in spans
-        ]
-    )
+    if vocabulary is None:
+        for span in spans:
+            for t in range(num_tokens - span + 1):
+                window = delimiter.join(token_list[t:t + span])
+
+                if not drop_window(window):
+                    yield window
+
+        return
+
+    token_ids = vocabulary.intern_tokens(token_list)
+    # Only join windows when the condition needs more than an emptiness check
+    join_windows = bool(drop_window.drop_predicates or drop_window.drop_regexes) \
+            or not drop_window.drop_tokens <= {''}
+
+    drop_empty = '' in drop_window.drop_tokens
+
+    for span in spans:
+        # A window joins to '' only when empty, or made of '' tokens without delimiters between them
+        empty_windows = drop_empty and (span == 1 or not delimiter)
+
+        for t in range(num_tokens - span + 1):
+            if join_windows:
+                if drop_window(delimiter.join(token_list[t:t + span])):
+                    continue
+            elif drop_empty and (span == 0 or empty_windows and \
+                all(token == '' for token in token_list[t:t + span])):
+                continue
+
+            yield tuple(token_ids[t:t + span])
+
+def iter_window_tokenize(text_sequences: any, spans: int, drop_token_cond: callable = drop_token_cond.empty,
+    drop_window_token_cond: callable = drop_token_cond.empty, delimiter: str = ' ',
+    vocabulary: TokenVocabulary = None) -> Iterator:
+    # Streams the windows of every text in <text_sequences>, e.g. into a Counter.
+    for text in iter_text_sequences(text_sequences):
+        yield from iter_window_tokens(word_tokenize(text, drop_token_cond), spans,
+                drop_window_token_cond, delimiter, vocabulary)
+
+@apply_on_text_sequences
+def window_tokenize(text: str, spans: int, drop_token_cond: callable = drop_token_cond.empty,
+    drop_window_token_cond: callable = drop_token_cond.empty, delimiter: str = ' ') -> list:
 
-    return drop_tokens_by_cond(window_token_list, drop_window_token_cond)
+    return list(iter_window_tokens(word_tokenize(text, drop_token_cond), spans,
+            drop_window_token_cond, delimiter))
 
 
 if __name__ == "__main__":
@@ -1,12 +1,18 @@
-import operator
+from functools import wraps
+from collections.abc import Iterator
 
-from functools import reduce
+from .ragged_sequences import RaggedSequences
 
 def apply_on_text_sequences(method: callable):
+    # wraps keeps the decorated functions picklable for process pools
+    @wraps(method)
     def wrapped_apply(text_sequences, *args, **kwargs):
         if isinstance(text_sequences, str):
             return method(text_sequences, *args, **kwargs)
 
+        if isinstance(text_sequences, RaggedSequences):
+            return text_sequences.map(method, *args, **kwargs)
+
         return [
             wrapped_apply(text_subsequences, *args, **kwargs)
             for text_subsequences in text_sequences
@@ -14,19 +20,28 @@ def apply_on_text_sequences(method: callable):
 
     return wrapped_apply
 
-def collapse_text_sequences(text_sequences: list) -> list:
+def iter_text_sequences(text_sequences: any) -> Iterator:
+    # Lazily yields the texts of <text_sequences> in depth-first order.
+    if text_sequences is None:
+        return
+
     if isinstance(text_sequences, str):
-        return [text_sequences]
+        yield text_sequences
+        return
 
-    if not text_sequences:
-        return []
+    if isinstance(text_sequences, RaggedSequences):
+        yield from (text for text in text_sequences.values if text is not None)
+        return
 
-    return reduce(
-        operator.add, [
-            collapse_text_sequences(text_subsequences)
-            for text_subsequences in text_sequences
-        ]
-    )
+    for text_subsequences in text_sequences:
+        yield from iter_text_sequences(text_subsequences)
+
+def collapse_text_sequences(text_sequences: list) -> list:
+    # None leaves are dropped, as by <iter_text_sequences>
+    if isinstance(text_sequences, RaggedSequences):
+        return [ text for text in text_sequences.values if text is not None ]
+
+    return list(iter_text_sequences(text_sequences))
 
 if __name__ == "__main__":
     pass
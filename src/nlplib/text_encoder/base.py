@@ -7,21 +7,107 @@ from collections.abc import Iterable
 from pyutils.pickable import PickableObject
 from pyutils.wrappers import FunctionWrapper
 
-from .ragged_tensor import padded_tensor, padded_tensor_shape
-from .encoder_reduction.base import BaseEncoderReduction
+from .ragged_tensor import is_ragged_leaf, padded_tensor, ragged_segments
+from .encoder_reduction.base import BaseEncoderReduction, BaseSegmentReduction
 from .encoder_reduction.numpy import NumpyReduction
+from .encoding_cache import EncodingCache
+from .pretokenized import PretokenizedDataset
+from .instrumentation import Instrumentation
+from ..text.ragged_sequences import RaggedSequences
+
+class MicroBatchScheduler:
+    """ Splits flat encoder inputs into micro-batches by padded token budget.
+
+    Inputs are sorted by token length so that each micro-batch pads to a
+    similar length; a micro-batch grows until its padded size (batch size x
+    longest input) would exceed <max_batch_tokens> or it holds
+    <max_batch_size> inputs. Outputs are restored to the input order.
+
+    Args:
+        max_batch_tokens (int): The maximum padded tokens per micro-batch.
+        max_batch_size (int): The maximum inputs per micro-batch.
+        sort_by_length (bool): Whether to bucket inputs by length.
+    """
+    def __init__(self, max_batch_tokens: int = 16384, max_batch_size: int = 256,
+        sort_by_length: bool = True) -> None:
+
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.sort_by_length = sort_by_length
+
+    def schedule(self, token_lengths: np.ndarray) -> list:
+        # Returns the input indices of each micro-batch.
+        token_lengths = np.maximum(np.asarray(token_lengths, dtype=int), 1)
+        order = np.argsort(token_lengths, kind="stable") if self.sort_by_length \
+                else np.arange(token_lengths.size)
+
+        batches = []
+        frm_idx = 0
+        max_length = 0
+
+        for to_idx, input_idx in enumerate(order):
+            max_length = max(max_length, token_lengths[input_idx])
+            batch_size = to_idx - frm_idx + 1
+
+            if batch_size > 1 and (batch_size > self.max_batch_size or \
+                batch_size * max_length > self.max_batch_tokens):
+
+                batches.append(order[frm_idx:to_idx])
+                frm_idx = to_idx
+                max_length = token_lengths[input_idx]
+
+        if frm_idx < order.size:
+            batches.append(order[frm_idx:])
+
+        return batches
+
+    @staticmethod
+    def gather(batches_idx: list, batches_outputs: Iterable, num_inputs: int) -> np.ndarray:
+        # Restores the outputs of the micro-batches in <batches_idx> to the input order.
+        flat_outputs = None
+
+        for batch_idx, batch_outputs in zip(batches_idx, batches_outputs):
+            batch_outputs = np.asarray(batch_outputs)
+
+            if flat_outputs is None:
+                flat_outputs = np.empty((num_inputs, *batch_outputs.shape[1:]),
+                        dtype=batch_outputs.dtype)
+
+            flat_outputs[batch_idx] = batch_outputs
+
+        return np.zeros(0) if flat_outputs is None else flat_outputs
+
+    def map(self, batch_fn: callable, flat_inputs: np.ndarray, token_lengths: np.ndarray) -> np.ndarray:
+        # Applies <batch_fn> to each micro-batch of <flat_inputs>, returning outputs in input order.
+        batches_idx = self.schedule(token_lengths)
+
+        return self.gather(batches_idx, (
+            batch_fn(flat_inputs[batch_idx]) for batch_idx in batches_idx
+        ), len(flat_inputs))
 
 class BaseTextEncoder (PickableObject, metaclass=ABCMeta):
     """ Docstring todo
     """
-    def __init__(self, encoder_reduction: BaseEncoderReduction = NumpyReduction(np.sum)):
+    def __init__(self, encoder_reduction: BaseEncoderReduction = NumpyReduction(np.sum),
+        encoding_cache: EncodingCache = None, batch_scheduler: MicroBatchScheduler = None,
+        instrumentation: Instrumentation = None):
+
         self.reduce_output = encoder_reduction
+        self.encoding_cache = encoding_cache
+        self.batch_scheduler = MicroBatchScheduler() if batch_scheduler is None \
+                else batch_scheduler
+        self.instrumentation = Instrumentation() if instrumentation is None \
+                else instrumentation
+
+    def model_identity(self) -> str:
+        # Identifies the model behind <flat_encode> in <encoding_cache> keys.
+        return f"{type(self).__module__}.{type(self).__qualname__}"
 
     def pad_inputs(self, text_inputs: Iterable, text_weights: Iterable = None) -> tuple:
         text_tensor = padded_tensor(text_inputs, pad_value='')
         
         if text_weights is None:
-            weight_tensor = np.ones(padded_tensor_shape(text_inputs), dtype=float)
+            weight_tensor = np.ones(text_tensor.shape, dtype=float)
             weight_tensor[text_tensor == ""] = 0
         else:
             weight_tensor = padded_tensor(text_weights, pad_value=0, dtype=float)
@@ -41,11 +127,173 @@ class BaseTextEncoder (PickableObject, metaclass=ABCMeta):
     def flat_map_encode(self, text_tensor: np.ndarray, **kwargs) -> np.ndarray:
         return self.flat_encode(text_tensor.flatten()).reshape(text_tensor.shape)
 
+    def estimate_token_lengths(self, flat_text_tensor: np.ndarray) -> np.ndarray:
+        # Whitespace word counts plus the [CLS] / [SEP] tokens; override with exact lengths.
+        return np.array([ len(text.split()) + 2 for text in flat_text_tensor ], dtype=int)
+
+    def map_micro_batches(self, batch_fn: callable, flat_inputs: np.ndarray,
+        token_lengths: np.ndarray) -> np.ndarray:
+        # <batch_scheduler.map>, recording a "flat_encode" stage with its token padding per micro-batch.
+        token_lengths = np.asarray(token_lengths, dtype=int)
+
+        def encode_micro_batch(batch_idx: np.ndarray) -> np.ndarray:
+            padded_tokens = batch_idx.size * int(token_lengths[batch_idx].max(initial=0))
+
+            with self.instrumentation.stage("flat_encode", batch_idx.size, padded_tokens=padded_tokens,
+                pad_fraction=1 - float(token_lengths[batch_idx].sum()) / max(padded_tokens, 1)):
+
+                return batch_fn(flat_inputs[batch_idx])
+
+        return self.batch_scheduler.map(encode_micro_batch, np.arange(len(flat_inputs)), token_lengths)
+
+    def batched_flat_encode(self, flat_text_tensor: np.ndarray) -> np.ndarray:
+        # <flat_encode> over the micro-batches of <batch_scheduler>.
+        flat_text_tensor = np.asarray(flat_text_tensor)
+
+        return self.map_micro_batches(self.flat_encode, flat_text_tensor,
+                self.estimate_token_lengths(flat_text_tensor))
+
+    def encode_entries(self, flat_text_tensor: np.ndarray) -> np.ndarray:
+        # Encodes <flat_text_tensor>; with <encoding_cache>, only misses are encoded.
+        if self.encoding_cache is not None:
+            return self.encoding_cache.encode(flat_text_tensor, self.batched_flat_encode,
+                    self.model_identity())
+
+        return self.batched_flat_encode(flat_text_tensor)
+
+    def ragged_flat_map_encode(self, text_tensor: any, weight_tensor: any, **kwargs) -> np.ndarray:
+        """ Same output as <flat_map_encode> weighted by <weight_tensor>, but only
+        the entries with non-zero weight (i.e. not padding) are encoded; the
+        others are left at zero.
+        """
+        entry_idx = np.flatnonzero(np.reshape(weight_tensor, [-1]))
+        entry_outputs = np.reshape(self.encode_entries(
+            np.reshape(text_tensor, [-1])[entry_idx]
+        ), [-1]) if entry_idx.size else np.zeros(0, dtype=np.asarray(weight_tensor).dtype)
+
+        output_tensor = np.zeros(np.prod(tuple(text_tensor.shape), dtype=int), dtype=entry_outputs.dtype)
+        output_tensor[entry_idx] = entry_outputs
+
+        return output_tensor.reshape(tuple(text_tensor.shape))
+
+    def tokenizer_identity(self) -> str:
+        # Identifies the tokenizer behind <pretokenize>; encoders sharing it share datasets.
+        return self.model_identity()
+
+    def pretokenize(self, flat_texts: list) -> list:
+        # The token ids of each text, as read by <flat_encode_pretokenized>.
+        raise NotImplementedError(f"{type(self).__name__} does not support pre-tokenized inputs.")
+
+    def flat_encode_pretokenized(self, token_batch: dict, **kwargs) -> np.ndarray:
+        # <flat_encode> given a <PretokenizedDataset.token_batch>.
+        raise NotImplementedError(f"{type(self).__name__} does not support pre-tokenized inputs.")
+
+    def batched_flat_encode_pretokenized(self, dataset: PretokenizedDataset, entry_idx: np.ndarray,
+        **kwargs) -> np.ndarray:
+        # <flat_encode_pretokenized> of the <entry_idx> entries of <dataset>, over the micro-batches of <batch_scheduler>.
+        return np.reshape(self.map_micro_batches(
+            lambda batch_idx: np.reshape(self.flat_encode_pretokenized(
+                dataset.token_batch(batch_idx), **kwargs
+            ), [-1]),
+            entry_idx, dataset.token_lengths()[entry_idx]
+        ), [-1])
+
+    def flatten_inputs(self, text_inputs: Iterable, text_weights: Iterable = None) -> tuple:
+        # <pad_inputs> without padding: the flat texts and weights, and the top-level segment of each.
+        flat_texts, segment_ids, num_segments = ragged_segments(text_inputs)
+
+        if text_weights is None:
+            return flat_texts, (flat_texts != "").astype(float), segment_ids, num_segments
+
+        flat_weights, weight_segment_ids, num_weight_segments = ragged_segments(text_weights)
+
+        assert num_weight_segments == num_segments and np.array_equal(weight_segment_ids, segment_ids), f"""
+            Incompatible Input Weights:
+            Cannot match the {flat_weights.size} <text_weights> in {num_weight_segments} sequences
+                    to the {flat_texts.size} <text_inputs> in {num_segments} sequences.
+        """
+
+        return flat_texts, flat_weights.astype(float), segment_ids, num_segments
+
+    def segment_encode(self, text_inputs: Iterable, text_weights: Iterable = None, **kwargs) -> any:
+        """ <encode> with a <BaseSegmentReduction>: the entries with non-zero weight
+        are encoded and reduced by top-level sequence, without padded tensors.
+        """
+        with self.instrumentation.stage("flatten_inputs") as record:
+            flat_texts, flat_weights, segment_ids, num_segments = \
+                    self.flatten_inputs(text_inputs, text_weights)
+
+            record["num_items"] = num_segments
+            record["pad_fraction"] = 0.
+
+        entry_idx = np.flatnonzero(flat_weights)
+        entry_outputs = np.reshape(self.encode_entries(flat_texts[entry_idx]), [-1]) \
+                if entry_idx.size else np.zeros(0, dtype=float)
+
+        with self.instrumentation.stage("reduce_output", num_segments):
+            return self.reduce_output.reduce_segments(entry_outputs, flat_weights[entry_idx],
+                    segment_ids[entry_idx], num_segments, **kwargs)
+
+    def pad_pretokenized_outputs(self, dataset: PretokenizedDataset, entry_outputs: np.ndarray) -> tuple:
+        # The padded output and weight tensors of <dataset>, as <pad_inputs> and <ragged_flat_map_encode> give.
+        structure_idx = np.asarray(dataset.structure.values)
+
+        return padded_tensor(dataset.structure.with_values(entry_outputs[structure_idx]),
+                    pad_value=0., dtype=float), \
+                padded_tensor(dataset.structure.with_values(dataset.weights[structure_idx]),
+                    pad_value=0., dtype=float)
+
+    def encode_pretokenized(self, dataset: PretokenizedDataset, **kwargs) -> any:
+        assert dataset.tokenizer_identity == self.tokenizer_identity(), f"""
+            Incompatible Dataset:
+            <dataset> was tokenized by {dataset.tokenizer_identity},
+                    not {self.tokenizer_identity()}.
+        """
+
+        entry_idx = np.flatnonzero(dataset.weights)
+        entry_outputs = np.zeros(dataset.num_entries, dtype=float)
+        segment_reduction = isinstance(self.reduce_output, BaseSegmentReduction)
+
+        if entry_idx.size:
+            entry_outputs[entry_idx] = self.batched_flat_encode_pretokenized(dataset, entry_idx, **kwargs)
+
+        if segment_reduction:
+            with self.instrumentation.stage("flatten_inputs", len(dataset)) as record:
+                structure_idx, segment_ids, num_segments = ragged_segments(dataset.structure)
+                structure_idx = structure_idx.astype(np.intp)
+                record["pad_fraction"] = 0.
+
+            with self.instrumentation.stage("reduce_output", num_segments):
+                return self.reduce_output.reduce_segments(entry_outputs[structure_idx],
+                        dataset.weights[structure_idx], segment_ids, num_segments, **kwargs)
+
+        with self.instrumentation.stage("pad_inputs", len(dataset)) as record:
+            output_tensor, weight_tensor = self.pad_pretokenized_outputs(dataset, entry_outputs)
+            record["pad_fraction"] = 1 - entry_idx.size / max(weight_tensor.size, 1)
+
+        with self.instrumentation.stage("reduce_output", len(dataset)):
+            return self.reduce_output(output_tensor, weight_tensor, **kwargs)
+
     def encode(self, text_inputs: Iterable, text_weights: Iterable = None, **kwargs) -> any:
-        text_tensor, weight_tensor = self.pad_inputs(text_inputs, text_weights)
-        output_tensor = self.flat_map_encode(text_tensor, **kwargs)
+        if isinstance(text_inputs, PretokenizedDataset):
+            return self.encode_pretokenized(text_inputs, **kwargs)
+
+        if isinstance(self.reduce_output, BaseSegmentReduction) and \
+            (isinstance(text_inputs, RaggedSequences) or not is_ragged_leaf(text_inputs)):
+
+            return self.segment_encode(text_inputs, text_weights, **kwargs)
+
+        with self.instrumentation.stage("pad_inputs") as record:
+            text_tensor, weight_tensor = self.pad_inputs(text_inputs, text_weights)
+
+            # Padding waste: the cells that are pads (or otherwise carry no weight)
+            record["num_items"] = int(np.shape(weight_tensor)[0]) if np.ndim(weight_tensor) else 1
+            record["pad_fraction"] = 1 - int(np.count_nonzero(weight_tensor)) / max(np.size(weight_tensor), 1)
+
+        output_tensor = self.ragged_flat_map_encode(text_tensor, weight_tensor, **kwargs)
 
-        return self.reduce_output(output_tensor, weight_tensor, **kwargs)
+        with self.instrumentation.stage("reduce_output", record["num_items"]):
+            return self.reduce_output(output_tensor, weight_tensor, **kwargs)
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,235 @@
+import asyncio
+import numpy as np
+
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from .base import BaseTextEncoder
+from ..text.utility import apply_on_text_sequences
+from ..text.ragged_sequences import RaggedSequences
+
+@apply_on_text_sequences
+def default_text_weight(text: str) -> float:
+    # The weights <BaseTextEncoder.pad_inputs> assumes when <text_weights> is un-specified
+    return float(text != "")
+
+class AsyncEncoderService:
+    """ Asyncio front-end that coalesces concurrent <encode> requests into
+    batches for <text_encoder>.
+
+    Requests are queued and gathered into a batch until it holds
+    <max_batch_size> documents or <max_wait_time> seconds have passed since
+    its first request. Each batch is encoded once in <executor>, and every
+    caller receives the outputs of its own documents.
+
+    Args:
+        text_encoder (BaseTextEncoder): The encoder serving the requests.
+        max_batch_size (int): The maximum documents (first axis of
+                <text_inputs>) per batch. A larger single request is encoded
+                as a batch by itself.
+        max_wait_time (float): The maximum seconds a batch waits for requests.
+        executor (Executor): Runs <text_encoder.encode>; defaults to a single
+                worker thread owned by the service.
+        metrics_window (int): The number of recent batch sizes kept.
+    """
+    def __init__(self, text_encoder: BaseTextEncoder, max_batch_size: int = 64,
+        max_wait_time: float = .005, executor: Executor = None, metrics_window: int = 1024) -> None:
+
+        self.text_encoder = text_encoder
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+
+        self.owns_executor = executor is None
+        self.executor = ThreadPoolExecutor(max_workers=1) if executor is None else executor
+
+        self.queue = None
+        self.worker_task = None
+        self.carried_request = None # Dequeued request that did not fit the last batch
+        self.current_batch = [] # Dequeued requests being gathered or encoded
+
+        self.num_requests = 0
+        self.num_batches = 0
+        self.num_documents = 0
+        self.batch_sizes = deque(maxlen=metrics_window)
+
+    @property
+    def queue_depth(self) -> int:
+        return (0 if self.queue is None else self.queue.qsize()) + \
+                (self.carried_request is not None)
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "requests": self.num_requests,
+            "batches": self.num_batches,
+            "documents": self.num_documents,
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.,
+            "max_batch_size": max(self.batch_sizes, default=0)
+        }
+
+    async def start(self) -> None:
+        if self.worker_task is None:
+            self.queue = asyncio.Queue()
+            self.worker_task = asyncio.get_running_loop().create_task(self.run())
+
+    async def close(self) -> None:
+        if self.worker_task is not None:
+            self.worker_task.cancel()
+
+            try:
+                await self.worker_task
+            except asyncio.CancelledError:
+                pass
+
+            pending = list(self.current_batch)
+
+            if self.carried_request is not None:
+                pending.append(self.carried_request)
+
+            while not self.queue.empty():
+                pending.append(self.queue.get_nowait())
+
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(RuntimeError("AsyncEncoderService was closed."))
+
+            self.worker_task = None
+            self.carried_request = None
+            self.current_batch = []
+
+        if self.owns_executor:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> "AsyncEncoderService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def encode(self, text_inputs: Iterable, text_weights: Iterable = None) -> any:
+        """ <text_encoder.encode> of <text_inputs>, computed within a shared batch.
+
+        The batch is padded as a whole, so reductions that depend on the
+        padded shape (e.g. NumpyReduction(np.mean)) may differ from encoding
+        <text_inputs> alone; sums and segment reductions do not.
+
+        Args:
+            text_inputs (Iterable): The (nested) documents to encode, or a single text.
+            text_weights (Iterable): The weights of <text_inputs>.
+        Returns:
+            output_tensor (any): The reduced outputs of <text_inputs>, or of the
+                    single text.
+        """
+        await self.start()
+
+        if isinstance(text_inputs, str): # A single document, not a sequence of characters
+            output_tensor = await self.encode([ text_inputs ],
+                    None if text_weights is None else [ text_weights ])
+
+            return output_tensor[0]
+
+        if isinstance(text_inputs, RaggedSequences):
+            text_inputs = text_inputs.to_nested()
+
+        if isinstance(text_weights, RaggedSequences):
+            text_weights = text_weights.to_nested()
+
+        future = asyncio.get_running_loop().create_future()
+        self.num_requests += 1
+
+        await self.queue.put((
+            list(text_inputs), None if text_weights is None else list(text_weights), future
+        ))
+
+        return await future
+
+    async def next_batch(self) -> list:
+        # Waits for a first request, then gathers requests until the batch is full or due.
+        loop = asyncio.get_running_loop()
+
+        # Gathered in <current_batch>, so <close> can fail the requests dequeued so far
+        batch = self.current_batch = []
+
+        if self.carried_request is None:
+            batch.append(await self.queue.get())
+        else:
+            batch.append(self.carried_request)
+            self.carried_request = None
+
+        batch_size = len(batch[0][0])
+        deadline = loop.time() + self.max_wait_time
+
+        while batch_size < self.max_batch_size:
+            timeout = deadline - loop.time()
+
+            if timeout <= 0:
+                break
+
+            try:
+                request = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+            if batch_size + len(request[0]) > self.max_batch_size:
+                self.carried_request = request
+                break
+
+            batch.append(request)
+            batch_size += len(request[0])
+
+        return batch
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self.next_batch()
+            batch = self.current_batch = [ request for request in batch if not request[2].cancelled() ]
+
+            if not batch:
+                continue
+
+            text_inputs = [ text_input for request_inputs, _, _ in batch for text_input in request_inputs ]
+            text_weights = None
+
+            if any(request_weights is not None for _, request_weights, _ in batch):
+                text_weights = [
+                    text_weight for request_inputs, request_weights, _ in batch
+                    for text_weight in (
+                        default_text_weight(request_inputs) if request_weights is None
+                        else request_weights
+                    )
+                ]
+
+            self.num_batches += 1
+            self.num_documents += len(text_inputs)
+            self.batch_sizes.append(len(text_inputs))
+
+            try:
+                output_tensor = await loop.run_in_executor(
+                    self.executor, self.text_encoder.encode, text_inputs, text_weights
+                )
+            except Exception as exception:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exception)
+
+                self.current_batch = []
+                continue
+
+            frm_idx = 0
+
+            for request_inputs, _, future in batch:
+                to_idx = frm_idx + len(request_inputs)
+
+                if not future.done():
+                    future.set_result(output_tensor[frm_idx:to_idx])
+
+                frm_idx = to_idx
+
+            self.current_batch = []
+
+if __name__ == "__main__":
+    pass
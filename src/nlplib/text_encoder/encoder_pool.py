@@ -0,0 +1,126 @@
+import os
+import numpy as np
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .base import BaseTextEncoder
+from .pretokenized import PretokenizedDataset
+
+pooled_encoders = {} # Pool id -> encoder, inherited by forked workers
+pooled_encoder = None # The encoder of the current worker process
+
+def init_pooled_encoder(pool_id: int, text_encoder: BaseTextEncoder = None,
+    threads_per_worker: int = None) -> None:
+
+    global pooled_encoder
+    pooled_encoder = pooled_encoders[pool_id] if text_encoder is None else text_encoder
+
+    if threads_per_worker is not None and hasattr(pooled_encoder, "set_num_threads"):
+        pooled_encoder.set_num_threads(threads_per_worker)
+
+def encode_pooled_batch(flat_text_tensor: np.ndarray) -> np.ndarray:
+    return np.asarray(pooled_encoder.flat_encode(flat_text_tensor))
+
+def encode_pooled_token_batch(token_batch: dict) -> np.ndarray:
+    return np.asarray(pooled_encoder.flat_encode_pretokenized(token_batch))
+
+class EncoderPool (BaseTextEncoder):
+    """ Runs the <flat_encode> micro-batches of <text_encoder> on worker processes
+    sharing a single copy of its weights.
+
+    With the "fork" start method, workers inherit the loaded <text_encoder>
+    and its weights are shared copy-on-write; create the pool before the
+    parent runs the model, since forking a process with live thread pools is
+    unsafe for some runtimes. With "spawn" or "forkserver", <text_encoder> is
+    sent to each worker after <share_memory> (when it has one) moves its
+    weights to shared memory, e.g. <PyTorchFinbert.share_memory>.
+
+    Args:
+        text_encoder (BaseTextEncoder): The loaded encoder.
+        n_workers (int): The number of worker processes, defaults to os.cpu_count().
+        start_method (str): The multiprocessing start method of the workers.
+        threads_per_worker (int): The intra-op threads of each worker, when
+                <text_encoder> has <set_num_threads>; avoids oversubscribing cores.
+        encoder_reduction (BaseEncoderReduction): Defaults to the reduction of
+                <text_encoder>.
+    """
+    def __init__(self, text_encoder: BaseTextEncoder, n_workers: int = None,
+        start_method: str = "fork", threads_per_worker: int = 1, encoder_reduction: any = None,
+        **kwargs):
+
+        kwargs.setdefault("batch_scheduler", text_encoder.batch_scheduler)
+        super().__init__(text_encoder.reduce_output if encoder_reduction is None
+                else encoder_reduction, **kwargs)
+
+        self.text_encoder = text_encoder
+        self.n_workers = n_workers or os.cpu_count()
+        self.pool_id = id(self)
+
+        if start_method == "fork":
+            # Workers are forked lazily, so the encoder stays registered until <close>
+            pooled_encoders[self.pool_id] = text_encoder
+            initargs = (self.pool_id, None, threads_per_worker)
+        else:
+            if hasattr(text_encoder, "share_memory"):
+                text_encoder.share_memory()
+
+            initargs = (self.pool_id, text_encoder, threads_per_worker)
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=init_pooled_encoder,
+            initargs=initargs
+        )
+
+    def model_identity(self) -> str:
+        return self.text_encoder.model_identity()
+
+    def estimate_token_lengths(self, flat_text_tensor: np.ndarray) -> np.ndarray:
+        return self.text_encoder.estimate_token_lengths(flat_text_tensor)
+
+    def tokenizer_identity(self) -> str:
+        return self.text_encoder.tokenizer_identity()
+
+    def pretokenize(self, flat_texts: list) -> list:
+        return self.text_encoder.pretokenize(flat_texts)
+
+    def flat_encode_pretokenized(self, token_batch: dict, **kwargs) -> np.ndarray:
+        return self.executor.submit(encode_pooled_token_batch, token_batch).result()
+
+    def flat_encode(self, flat_text_tensor: np.ndarray, **kwargs) -> np.ndarray:
+        return self.executor.submit(encode_pooled_batch, np.asarray(flat_text_tensor)).result()
+
+    def batched_flat_encode(self, flat_text_tensor: np.ndarray) -> np.ndarray:
+        # Micro-batches are encoded concurrently, one per worker at a time.
+        flat_text_tensor = np.asarray(flat_text_tensor)
+        batches_idx = self.batch_scheduler.schedule(self.estimate_token_lengths(flat_text_tensor))
+
+        with self.instrumentation.stage("flat_encode", flat_text_tensor.size, micro_batches=len(batches_idx)):
+            return self.batch_scheduler.gather(batches_idx, self.executor.map(
+                encode_pooled_batch, [ flat_text_tensor[batch_idx] for batch_idx in batches_idx ]
+            ), flat_text_tensor.size)
+
+    def batched_flat_encode_pretokenized(self, dataset: PretokenizedDataset, entry_idx: np.ndarray,
+        **kwargs) -> np.ndarray:
+        # Micro-batches are encoded concurrently, one per worker at a time.
+        batches_idx = self.batch_scheduler.schedule(dataset.token_lengths()[entry_idx])
+
+        with self.instrumentation.stage("flat_encode", entry_idx.size, micro_batches=len(batches_idx)):
+            return np.reshape(self.batch_scheduler.gather(batches_idx, self.executor.map(
+                encode_pooled_token_batch, [ dataset.token_batch(entry_idx[batch_idx]) for batch_idx in batches_idx ]
+            ), entry_idx.size), [-1])
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        pooled_encoders.pop(self.pool_id, None)
+
+    def __enter__(self) -> "EncoderPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+if __name__ == "__main__":
+    pass
@@ -8,5 +8,51 @@ class BaseEncoderReduction (metaclass=ABCMeta):
     def __call__(self, encoded_tensor: np.ndarray, weight_tensor: np.ndarray, **kwargs) -> any:
         raise NotImplementedError()
 
+class BaseSegmentReduction (BaseEncoderReduction):
+    """ Reduces flat encoded values into segments (e.g. the top-level inputs),
+    without a padded tensor.
+
+    With x = value * weight, the reduction <mode> of each segment is one of:
+        "sum": sum(x)
+        "mean": sum(x) / the number of non-zero weights
+        "weighted_mean": sum(x) / sum(weight)
+        "self_weighted_average": sum(sign(x) * x ** 2) / (sum(|x|) + 1e-5)
+    Segments without entries reduce to 0. Called with dense padded tensors,
+    each index along axis 0 is a segment, as in <NumpyReduction>.
+
+    Args:
+        mode (str): The reduction of each segment.
+    """
+    modes = ("sum", "mean", "weighted_mean", "self_weighted_average")
+
+    def __init__(self, mode: str = "sum") -> None:
+        assert mode in self.modes, f"""
+            Incompatible Reduction Mode:
+            <mode> must be one of {self.modes}, not {mode}.
+        """
+
+        self.mode = mode
+
+    @abstractmethod
+    def reduce_segments(self, values: any, weights: any, segment_ids: any, num_segments: int,
+        **kwargs) -> any:
+        """ Reduces the flat <values> weighted by <weights> by <segment_ids>.
+        Args:
+            values (any): The (num_entries, ) encoded values.
+            weights (any): The (num_entries, ) weights.
+            segment_ids (any): The (num_entries, ) segment of each entry, in [0, <num_segments>).
+            num_segments (int): The number of segments.
+        Returns:
+            reduced_values (any): The (num_segments, ) reduced values.
+        """
+        raise NotImplementedError()
+
+    def reduce_offsets(self, values: any, weights: any, offsets: np.ndarray, **kwargs) -> any:
+        # <reduce_segments> of contiguous segments given their (num_segments + 1, ) row splits.
+        offsets = np.asarray(offsets, dtype=np.int64)
+        segment_ids = np.repeat(np.arange(offsets.size - 1), np.diff(offsets))
+
+        return self.reduce_segments(values, weights, segment_ids, offsets.size - 1, **kwargs)
+
 if __name__ == "__main__":
     pass
@@ -1,6 +1,6 @@
 import numpy as np
 
-from .base import BaseEncoderReduction
+from .base import BaseEncoderReduction, BaseSegmentReduction
 from pyutils.wrappers import FunctionWrapper
 
 class NumpyReduction (FunctionWrapper, BaseEncoderReduction):
@@ -15,5 +15,41 @@ class NumpyReduction (FunctionWrapper, BaseEncoderReduction):
             **kwargs
         )
 
+class NumpySegmentReduction (BaseSegmentReduction):
+    # <BaseSegmentReduction> with np.bincount segment sums.
+    def reduce_segments(self, values: np.ndarray, weights: np.ndarray, segment_ids: np.ndarray,
+        num_segments: int, **kwargs) -> np.ndarray:
+
+        segment_ids = np.asarray(segment_ids, dtype=np.intp).reshape(-1)
+        weights = np.asarray(weights, dtype=float).reshape(-1)
+        weighted_values = np.asarray(values, dtype=float).reshape(-1) * weights
+
+        if self.mode == "self_weighted_average":
+            return np.bincount(segment_ids, weighted_values * np.abs(weighted_values), num_segments) / (
+                np.bincount(segment_ids, np.abs(weighted_values), num_segments) + 0.00001
+            )
+
+        segment_sums = np.bincount(segment_ids, weighted_values, num_segments)
+
+        if self.mode == "sum":
+            return segment_sums
+
+        segment_sizes = np.bincount(segment_ids[weights != 0], minlength=num_segments) \
+                if self.mode == "mean" else np.bincount(segment_ids, weights, num_segments)
+
+        return np.divide(segment_sums, segment_sizes, out=np.zeros(num_segments),
+                where=segment_sizes != 0)
+
+    def __call__(self, encoded_tensor: np.ndarray, weight_tensor: np.ndarray,
+        **kwargs) -> np.ndarray:
+        # Dense adapter: each index along axis 0 is a segment.
+        encoded_tensor = np.asarray(encoded_tensor)
+        num_segments = encoded_tensor.shape[0] if encoded_tensor.ndim else 1
+        segment_size = encoded_tensor.size // max(num_segments, 1)
+
+        return self.reduce_segments(encoded_tensor, weight_tensor, np.repeat(
+            np.arange(num_segments), segment_size
+        ), num_segments, **kwargs)
+
 if __name__ == "__main__":
     pass
@@ -1,6 +1,6 @@
 import tensorflow as tf
 
-from .base import BaseEncoderReduction
+from .base import BaseEncoderReduction, BaseSegmentReduction
 from pyutils.wrappers import FunctionWrapper
 
 class TensorflowReduction (FunctionWrapper, BaseEncoderReduction):
@@ -15,6 +15,49 @@ class TensorflowReduction (FunctionWrapper, BaseEncoderReduction):
             **kwargs
         )
 
+class TensorflowSegmentReduction (BaseSegmentReduction):
+    # <BaseSegmentReduction> with tf.math.unsorted_segment_sum; usable in tf.function.
+    def reduce_segments(self, values: tf.Tensor, weights: tf.Tensor, segment_ids: tf.Tensor,
+        num_segments: any, **kwargs) -> tf.Tensor:
+
+        values = tf.reshape(tf.convert_to_tensor(values), [-1])
+        weights = tf.reshape(tf.cast(weights, values.dtype), [-1])
+        segment_ids = tf.reshape(tf.cast(segment_ids, tf.int32), [-1])
+        weighted_values = values * weights
+
+        if self.mode == "self_weighted_average":
+            return tf.math.unsorted_segment_sum(
+                tf.sign(weighted_values) * tf.pow(
+                    weighted_values, tf.constant(2, dtype=weighted_values.dtype)
+                ), segment_ids, num_segments
+            ) / ( # perturbation to prevent divide by zero-errors
+                tf.math.unsorted_segment_sum(tf.abs(weighted_values), segment_ids, num_segments) +
+                tf.constant(0.00001, dtype=weighted_values.dtype)
+            )
+
+        segment_sums = tf.math.unsorted_segment_sum(weighted_values, segment_ids, num_segments)
+
+        if self.mode == "sum":
+            return segment_sums
+
+        segment_sizes = tf.math.unsorted_segment_sum(
+            tf.cast(tf.not_equal(weights, 0), weights.dtype) if self.mode == "mean" else weights,
+            segment_ids, num_segments
+        )
+
+        return tf.math.divide_no_nan(segment_sums, segment_sizes)
+
+    def __call__(self, encoded_tensor: tf.Tensor, weight_tensor: tf.Tensor,
+        **kwargs) -> tf.Tensor:
+        # Dense adapter: each index along axis 0 is a segment.
+        encoded_tensor = tf.convert_to_tensor(encoded_tensor)
+        num_segments = tf.shape(encoded_tensor)[0]
+        segment_size = tf.size(encoded_tensor) // tf.maximum(num_segments, 1)
+
+        return self.reduce_segments(encoded_tensor, weight_tensor, tf.repeat(
+            tf.range(num_segments), segment_size
+        ), num_segments, **kwargs)
+
 # Functions
 def reduce_self_weighted_average(input_tensor: tf.Tensor, axis: tf.Tensor) -> tf.Tensor:
     return tf.reduce_sum(
@@ -0,0 +1,162 @@
+import io
+import os
+import hashlib
+import sqlite3
+import numpy as np
+
+from collections import OrderedDict
+
+class EncodingCache:
+    """ Two-tier cache of per-text encoder outputs.
+
+    Texts are deduplicated within each batch and looked up by a hash of the
+    text and the encoder's model identity, first in a bounded in-memory LRU
+    and then, when <cache_fpath> is specified, in a persistent SQLite table.
+    Only the misses are sent to the encoder.
+
+    Args:
+        max_size (int): The maximum number of outputs held in memory.
+        cache_fpath (str): The SQLite file of the persistent tier.
+        model_identity (str): Overrides the identity reported by the encoder,
+                e.g. to tell fine-tuned weights of the same model apart.
+
+    The SQLite connection is opened lazily in each process, so the cache (and
+    its encoder) can be pickled to spawned workers or inherited by forked ones.
+    """
+    def __init__(self, max_size: int = 100_000, cache_fpath: str = None,
+        model_identity: str = None) -> None:
+
+        self.max_size = max_size
+        self.model_identity = model_identity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.cache_fpath = cache_fpath
+        self.connection = None
+        self.connection_pid = None
+
+    def get_connection(self) -> sqlite3.Connection:
+        # The connection of the current process; connections are not shared across forks.
+        if self.cache_fpath is None:
+            return None
+
+        if self.connection is None or self.connection_pid != os.getpid():
+            self.connection = sqlite3.connect(self.cache_fpath, check_same_thread=False)
+            self.connection_pid = os.getpid()
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS encodings (key TEXT PRIMARY KEY, model_identity TEXT, value BLOB)"
+            )
+
+        return self.connection
+
+    def __getstate__(self) -> dict:
+        return { **self.__dict__, "connection": None, "connection_pid": None }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+    @staticmethod
+    def text_key(text: any, model_identity: str) -> str:
+        text = text.encode("utf-8") if isinstance(text, str) else bytes(text)
+        return hashlib.sha256(model_identity.encode("utf-8") + b"\0" + text).hexdigest()
+
+    def lookup(self, keys: list) -> dict:
+        found = {}
+
+        for key in keys:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                found[key] = self.entries[key]
+
+        connection = self.get_connection()
+
+        if connection is not None:
+            missing = [ key for key in keys if key not in found ]
+
+            for frm_idx in range(0, len(missing), 500): # SQLite bound parameter limit
+                batch = missing[frm_idx:frm_idx + 500]
+                rows = connection.execute(
+                    f"SELECT key, value FROM encodings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+
+                for key, value in rows:
+                    found[key] = np.load(io.BytesIO(value))
+                    self.store_in_memory(key, found[key])
+
+        return found
+
+    def store_in_memory(self, key: str, value: np.ndarray) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def store(self, encodings: dict, model_identity: str) -> None:
+        for key, value in encodings.items():
+            self.store_in_memory(key, value)
+
+        connection = self.get_connection()
+
+        if connection is not None:
+            rows = []
+
+            for key, value in encodings.items():
+                buffer = io.BytesIO()
+                np.save(buffer, value)
+                rows.append((key, model_identity, buffer.getvalue()))
+
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO encodings (key, model_identity, value) VALUES (?, ?, ?)", rows
+                )
+
+    def encode(self, flat_text_tensor: np.ndarray, flat_encode: callable,
+        model_identity: str) -> np.ndarray:
+        """ Encodes <flat_text_tensor>, sending only unique uncached texts to <flat_encode>.
+        Returns:
+            output_tensor (np.ndarray): The outputs of <flat_text_tensor>, in order.
+        """
+        flat_text_tensor = np.asarray(flat_text_tensor)
+        unique_texts, inverse_idx = np.unique(flat_text_tensor, return_inverse=True)
+
+        if not unique_texts.size:
+            return np.zeros(0)
+
+        model_identity = self.model_identity or model_identity
+        keys = [ self.text_key(text, model_identity) for text in unique_texts ]
+        found = self.lookup(keys)
+
+        miss_idx = [ idx for idx, key in enumerate(keys) if key not in found ]
+        self.hits += len(keys) - len(miss_idx)
+        self.misses += len(miss_idx)
+
+        if miss_idx:
+            miss_outputs = np.asarray(flat_encode(unique_texts[miss_idx]))
+            miss_encodings = { keys[idx]: output.copy() for idx, output in zip(miss_idx, miss_outputs) }
+
+            self.store(miss_encodings, model_identity)
+            found.update(miss_encodings)
+
+        return np.stack([ found[key] for key in keys ])[inverse_idx.reshape(-1)]
+
+    def clear(self, model_identity: str = None) -> None:
+        # Clears the memory tier, and the persistent outputs of <model_identity> (or all).
+        self.entries.clear()
+        connection = self.get_connection()
+
+        if connection is not None:
+            with connection:
+                if model_identity is None:
+                    connection.execute("DELETE FROM encodings")
+                else:
+                    connection.execute("DELETE FROM encodings WHERE model_identity = ?",
+                            (self.model_identity or model_identity, ))
+
+    def stats(self) -> dict:
+        return { "hits": self.hits, "misses": self.misses, "size": len(self.entries) }
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,95 @@
+import time
+import pandas as pd
+
+from contextlib import contextmanager
+
+class Instrumentation:
+    """ Per-stage timing hook of the text encoders; the base class discards its records.
+
+    Each stage (pad_inputs or flatten_inputs, tokenization, flat_encode, reduce_output,
+    train_step, ...) produces one record holding its wall time, item count,
+    throughput and stage-specific metrics such as pad_fraction, the fraction
+    of padded cells or tokens. Override <emit> to export the records.
+    """
+    @contextmanager
+    def stage(self, stage_name: str, num_items: int = 0, **metrics) -> dict:
+        # Times the enclosed block; metrics known only inside it can be added to the yielded record.
+        record = { "stage": stage_name, "num_items": int(num_items), **metrics }
+        start_time = time.perf_counter()
+
+        try:
+            yield record
+        finally:
+            record["wall_time"] = time.perf_counter() - start_time
+            record["throughput"] = record["num_items"] / record["wall_time"] \
+                    if record["wall_time"] > 0 else float("nan")
+
+            self.emit(record)
+
+    def emit(self, record: dict) -> None:
+        pass
+
+class RecordingInstrumentation (Instrumentation):
+    """ Keeps every record, and the peak batch size (item count) of each stage.
+    Args:
+        max_records (int): When specified, only the latest records are kept.
+    """
+    def __init__(self, max_records: int = None) -> None:
+        self.max_records = max_records
+        self.records = []
+        self.peak_batch_sizes = {}
+
+    def emit(self, record: dict) -> None:
+        self.records.append(record)
+
+        if self.max_records is not None and len(self.records) > self.max_records:
+            del self.records[:len(self.records) - self.max_records]
+
+        self.peak_batch_sizes[record["stage"]] = max(
+            self.peak_batch_sizes.get(record["stage"], 0), record["num_items"]
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame.from_records(self.records)
+
+    def summary(self) -> pd.DataFrame:
+        """ Aggregates the records by stage.
+        Returns:
+            summary (pd.DataFrame): The calls, total wall time and items, overall
+                    throughput, mean pad fraction (where recorded) and peak batch
+                    size of each stage.
+        """
+        records = self.to_frame()
+
+        if records.empty:
+            return pd.DataFrame()
+
+        summary = records.groupby("stage", sort=False).agg(
+            calls=("stage", "size"), wall_time=("wall_time", "sum"), num_items=("num_items", "sum")
+        )
+
+        summary["throughput"] = summary["num_items"] / summary["wall_time"]
+
+        if "pad_fraction" in records:
+            summary["pad_fraction"] = records.groupby("stage", sort=False)["pad_fraction"].mean()
+
+        summary["peak_batch_size"] = pd.Series(self.peak_batch_sizes)
+        return summary
+
+    def clear(self) -> None:
+        self.records.clear()
+        self.peak_batch_sizes.clear()
+
+class CallbackInstrumentation (Instrumentation):
+    """ Passes each record to <callback>, e.g. a metrics exporter or logger.
+    Args:
+        callback (callable): Called with each record (dict).
+    """
+    def __init__(self, callback: callable) -> None:
+        self.callback = callback
+
+    def emit(self, record: dict) -> None:
+        self.callback(record)
+
+if __name__ == "__main__":
+    pass
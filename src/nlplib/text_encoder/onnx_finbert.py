@@ -0,0 +1,150 @@
+import os
+import numpy as np
+import onnxruntime as ort
+
+from tokenizers import Tokenizer
+
+from .base import BaseTextEncoder
+from .encoder_reduction.base import BaseEncoderReduction
+from .encoder_reduction.numpy import NumpyReduction
+
+ONNX_MODEL_FNAME = "model.onnx"
+TOKENIZER_FNAME = "tokenizer.json"
+
+def export_finbert_onnx(model_dpath: str, model_name: str = "ProsusAI/finbert",
+    opset_version: int = 14) -> str:
+    """ Exports the FinBERT classifier and its tokenizer to <model_dpath> for <OnnxFinbert>.
+    Returns:
+        model_fpath (str): The path of the exported ONNX graph.
+    """
+    # Export-time only dependencies: serving the graph needs neither torch nor transformers
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+
+    os.makedirs(model_dpath, exist_ok=True)
+    model_fpath = os.path.join(model_dpath, ONNX_MODEL_FNAME)
+    input_names = [ "input_ids", "attention_mask", "token_type_ids" ]
+    inputs = tokenizer([ "Stocks rallied after the earnings report." ], return_tensors="pt")
+
+    with torch.inference_mode():
+        torch.onnx.export(
+            model, tuple(inputs[input_name] for input_name in input_names), model_fpath,
+            input_names=input_names,
+            output_names=[ "logits" ],
+            dynamic_axes={
+                **{ input_name: { 0: "batch", 1: "sequence" } for input_name in input_names },
+                "logits": { 0: "batch" }
+            },
+            opset_version=opset_version
+        )
+
+    tokenizer.save_pretrained(model_dpath)
+    return model_fpath
+
+class OnnxFinbert (BaseTextEncoder):
+    """ FinBERT scores served from a graph exported by <export_finbert_onnx>,
+    run by the onnxruntime CPU provider with full graph optimizations.
+    Args:
+        model_dpath (str): The directory holding the exported graph and tokenizer.
+        encoder_reduction (BaseEncoderReduction): Reduces the padded scores.
+        num_threads (int): The intra-op threads of the inference session.
+        max_length (int): The maximum tokens per text.
+    """
+    model_name = "ProsusAI/finbert"
+
+    def __init__(self, model_dpath: str, encoder_reduction: BaseEncoderReduction = NumpyReduction(np.sum),
+        num_threads: int = None, max_length: int = 512, **kwargs):
+
+        super().__init__(encoder_reduction, **kwargs)
+
+        self.model_dpath = model_dpath
+        self.num_threads = num_threads
+        self.max_length = max_length
+        self.load_session()
+
+    def load_session(self) -> None:
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        if self.num_threads is not None:
+            session_options.intra_op_num_threads = self.num_threads
+
+        self.session = ort.InferenceSession(
+            os.path.join(self.model_dpath, ONNX_MODEL_FNAME), session_options,
+            providers=[ "CPUExecutionProvider" ]
+        )
+
+        self.input_names = { session_input.name for session_input in self.session.get_inputs() }
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.model_dpath, TOKENIZER_FNAME))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+
+    def model_identity(self) -> str:
+        return f"{super().model_identity()}:{self.model_name}"
+
+    def tokenize(self, flat_text_tensor: np.ndarray) -> list:
+        return self.tokenizer.encode_batch([ str(text) for text in flat_text_tensor ])
+
+    def score(self, encodings: list) -> np.ndarray:
+        max_length = max(len(encoding.ids) for encoding in encodings)
+        inputs = {
+            input_name: np.zeros((len(encodings), max_length), dtype=np.int64)
+            for input_name in ("input_ids", "attention_mask", "token_type_ids")
+        }
+
+        for idx, encoding in enumerate(encodings):
+            inputs["input_ids"][idx, :len(encoding.ids)] = encoding.ids
+            inputs["attention_mask"][idx, :len(encoding.ids)] = encoding.attention_mask
+            inputs["token_type_ids"][idx, :len(encoding.ids)] = encoding.type_ids
+
+        return self.score_inputs(inputs)
+
+    def score_inputs(self, inputs: dict) -> np.ndarray:
+        logits = self.session.run([ "logits" ], {
+            input_name: input_tensor for input_name, input_tensor in inputs.items()
+            if input_name in self.input_names
+        })[0]
+
+        # prediction probability distributed: positive (+1) / negative (-1) / neutral (0)
+        predictions = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        predictions /= predictions.sum(axis=-1, keepdims=True)
+
+        return predictions[:, 0] - predictions[:, 1]
+
+    def flat_encode(self, flat_text_tensor: np.ndarray, **kwargs) -> np.ndarray:
+        return self.score(self.tokenize(flat_text_tensor))
+
+    def tokenizer_identity(self) -> str:
+        # Same tokenizer as <PyTorchFinbert>, so either can read the other's datasets
+        return f"transformers:{self.model_name}"
+
+    def pretokenize(self, flat_texts: list) -> list:
+        return [ encoding.ids for encoding in self.tokenize(flat_texts) ]
+
+    def flat_encode_pretokenized(self, token_batch: dict, **kwargs) -> np.ndarray:
+        return self.score_inputs(token_batch)
+
+    def batched_flat_encode(self, flat_text_tensor: np.ndarray) -> np.ndarray:
+        # Tokenizes once, then pads each micro-batch only to its own longest input.
+        with self.instrumentation.stage("tokenization", len(flat_text_tensor)):
+            encodings = self.tokenize(flat_text_tensor)
+
+        token_lengths = np.array([ len(encoding.ids) for encoding in encodings ], dtype=int)
+
+        return self.map_micro_batches(
+            lambda batch_idx: self.score([ encodings[idx] for idx in batch_idx ]),
+            np.arange(token_lengths.size), token_lengths
+        )
+
+    # Restoring the inference session: overriding Pickable methods
+    def save_unpickable_attrs(self, fpath: str) -> None:
+        pass # The exported graph already lives in <model_dpath>
+
+    def restore_unpickable_attrs(self, fpath: str) -> None:
+        self.load_session()
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,180 @@
+import os
+import json
+import numpy as np
+
+from itertools import islice
+from collections.abc import Iterable
+
+from .ragged_tensor import padded_tensor, ragged_sequences_shape, ragged_sequences_leaf_idx
+from ..text.ragged_sequences import RaggedSequences
+
+class PretokenizedDataset:
+    """ Text inputs tokenized once by an encoder, for repeated encoding and training.
+
+    The token ids of every text (entry) are stored back to back in <token_ids>,
+    with the tokens of entry i in [token_offsets[i], token_offsets[i + 1]).
+    <structure> holds the nesting of the original inputs, with entry indices
+    as values, and <weights> the weight of each entry. Attention masks and
+    token type ids (single segment) are derived per batch from the offsets.
+    Saved datasets are plain .npy files that are memory-mapped on load.
+
+    Args:
+        token_ids (np.ndarray): The concatenated token ids of the entries.
+        token_offsets (np.ndarray): The (num_entries + 1, ) token row splits.
+        structure (RaggedSequences): The nesting of the entries.
+        weights (np.ndarray): The (num_entries, ) entry weights.
+        tokenizer_identity (str): The <tokenizer_identity> of the tokenizing encoder.
+    """
+    def __init__(self, token_ids: np.ndarray, token_offsets: np.ndarray, structure: RaggedSequences,
+        weights: np.ndarray, tokenizer_identity: str) -> None:
+
+        self.token_ids = token_ids
+        self.token_offsets = token_offsets
+        self.structure = structure
+        self.weights = weights
+        self.tokenizer_identity = tokenizer_identity
+
+    @classmethod
+    def build(cls, text_encoder: any, text_inputs: Iterable, text_weights: Iterable = None,
+        chunk_size: int = 10_000) -> "PretokenizedDataset":
+        """ Tokenizes <text_inputs> with <text_encoder.pretokenize>.
+        Args:
+            text_encoder (BaseTextEncoder): The encoder that will read the dataset.
+            text_inputs (Iterable): Nested texts, all at the same depth, or RaggedSequences.
+            text_weights (Iterable): The weights of <text_inputs>; by default
+                    1 for each text and 0 for empty texts.
+            chunk_size (int): The number of texts tokenized at a time.
+        Returns:
+            dataset (PretokenizedDataset): The in-memory dataset.
+        """
+        if not isinstance(text_inputs, RaggedSequences):
+            text_inputs = RaggedSequences.from_nested(text_inputs)
+
+        texts = [ "" if text is None else str(text) for text in text_inputs.values ]
+        structure = text_inputs.with_values(np.arange(len(texts)))
+
+        if text_weights is None:
+            weights = np.array([ text != "" for text in texts ], dtype=float)
+        else:
+            shape = ragged_sequences_shape(structure)
+            weight_tensor = padded_tensor(text_weights, pad_value=0, dtype=float)
+
+            assert list(weight_tensor.shape) == shape, f"""
+                Incompatible Input Weights:
+                Cannot cast <text_weights> with padded shape {weight_tensor.shape}
+                        to <text_inputs> padded shape of {shape}.
+            """
+
+            weights = weight_tensor[ragged_sequences_leaf_idx(structure, shape)]
+
+        token_chunks, token_lengths = [], []
+        text_iter = iter(texts)
+
+        while True:
+            chunk_texts = list(islice(text_iter, chunk_size))
+
+            if not chunk_texts:
+                break
+
+            for text_token_ids in text_encoder.pretokenize(chunk_texts):
+                token_chunks.append(np.asarray(text_token_ids, dtype=np.int32))
+                token_lengths.append(len(text_token_ids))
+
+        token_ids = np.concatenate(token_chunks) if token_chunks else np.zeros(0, dtype=np.int32)
+        token_offsets = np.cumsum([ 0, *token_lengths ], dtype=np.int64)
+
+        return cls(token_ids, token_offsets, structure, weights, text_encoder.tokenizer_identity())
+
+    def __len__(self) -> int:
+        return len(self.structure)
+
+    @property
+    def num_entries(self) -> int:
+        return self.token_offsets.size - 1
+
+    def token_lengths(self) -> np.ndarray:
+        return np.diff(self.token_offsets)
+
+    def token_batch(self, entry_idx: np.ndarray, pad_id: int = 0) -> dict:
+        """ Pads the tokens of <entry_idx> to their longest length.
+        Returns:
+            token_batch (dict): (len(entry_idx), max_length) arrays of
+                    "input_ids", "attention_mask" and "token_type_ids".
+        """
+        entry_idx = np.asarray(entry_idx, dtype=np.int64)
+        frm_idx = self.token_offsets[entry_idx]
+        token_lengths = self.token_offsets[entry_idx + 1] - frm_idx
+
+        row_idx = np.repeat(np.arange(entry_idx.size), token_lengths)
+        col_idx = np.arange(row_idx.size) - np.repeat(np.cumsum(token_lengths) - token_lengths, token_lengths)
+        max_length = int(token_lengths.max(initial=0))
+
+        input_ids = np.full((entry_idx.size, max_length), pad_id, dtype=np.int64)
+        input_ids[row_idx, col_idx] = self.token_ids[np.repeat(frm_idx, token_lengths) + col_idx]
+
+        attention_mask = np.zeros((entry_idx.size, max_length), dtype=np.int64)
+        attention_mask[row_idx, col_idx] = 1
+
+        return {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids)
+        }
+
+    def padded_token_tensors(self, pad_id: int = 0) -> tuple:
+        """ Pads the entries to the padded shape of <structure>, as <pad_inputs> would.
+        Returns:
+            token_tensors (dict): (*text_shape, max_length) arrays of "input_ids",
+                    "attention_mask" and "token_type_ids"; pads have no tokens.
+            weight_tensor (np.ndarray): The padded weights of shape text_shape.
+        """
+        token_batch = self.token_batch(np.arange(self.num_entries), pad_id)
+        shape = ragged_sequences_shape(self.structure)
+        leaf_idx = ragged_sequences_leaf_idx(self.structure, shape)
+        entry_idx = np.asarray(self.structure.values)
+
+        token_tensors = {}
+
+        for key, entry_tokens in token_batch.items():
+            token_tensors[key] = np.full((*shape, entry_tokens.shape[1]), pad_id if key == "input_ids" else 0,
+                    dtype=entry_tokens.dtype)
+            token_tensors[key][leaf_idx] = entry_tokens[entry_idx]
+
+        weight_tensor = np.zeros(shape, dtype=float)
+        weight_tensor[leaf_idx] = self.weights[entry_idx]
+
+        return token_tensors, weight_tensor
+
+    def save(self, dpath: str) -> None:
+        os.makedirs(dpath, exist_ok=True)
+
+        with open(os.path.join(dpath, "dataset.json"), 'w', encoding="utf-8") as f:
+            json.dump({
+                "tokenizer_identity": self.tokenizer_identity,
+                "depth": self.structure.depth
+            }, f)
+
+        np.save(os.path.join(dpath, "token_ids.npy"), self.token_ids)
+        np.save(os.path.join(dpath, "token_offsets.npy"), self.token_offsets)
+        np.save(os.path.join(dpath, "weights.npy"), self.weights)
+
+        for level, level_offsets in enumerate(self.structure.offsets):
+            np.save(os.path.join(dpath, f"structure_offsets_{level}.npy"), level_offsets)
+
+    @classmethod
+    def load(cls, dpath: str, mmap_mode: str = 'r') -> "PretokenizedDataset":
+        with open(os.path.join(dpath, "dataset.json"), 'r', encoding="utf-8") as f:
+            metadata = json.load(f)
+
+        load = lambda fname: np.load(os.path.join(dpath, fname), mmap_mode=mmap_mode)
+        token_offsets = load("token_offsets.npy")
+
+        structure = RaggedSequences(np.arange(token_offsets.size - 1), [
+            load(f"structure_offsets_{level}.npy") for level in range(metadata["depth"])
+        ])
+
+        return cls(load("token_ids.npy"), token_offsets, structure, load("weights.npy"),
+                metadata["tokenizer_identity"])
+
+if __name__ == "__main__":
+    pass
@@ -1,3 +1,4 @@
+import torch
 import numpy as np
 
 from torch.nn.functional import softmax
@@ -7,27 +8,133 @@ from .base import BaseTextEncoder
 from .encoder_reduction.base import BaseEncoderReduction
 from .encoder_reduction.numpy import NumpyReduction
 
+class QuantizationToleranceExceeded(Exception):
+    def __init__(self, max_error: float, tolerance: float) -> None:
+        super().__init__(
+            f"Quantized scores deviate from fp32 scores by up to {max_error:.6f}, " + \
+            f"above the tolerance of {tolerance}."
+        )
+
 class PyTorchFinbert (BaseTextEncoder):
-    def __init__(self, encoder_reduction: BaseEncoderReduction = NumpyReduction(np.sum)):
-        super().__init__(encoder_reduction)
+    """ ProsusAI/finbert sentiment scores (positive - negative probability).
+    Args:
+        encoder_reduction (BaseEncoderReduction): Reduces the padded scores.
+        num_threads (int): The intra-op threads used by torch (process-wide).
+        num_interop_threads (int): The inter-op threads used by torch (process-wide);
+                can only be set before torch runs any parallel work.
+        quantize (bool): Whether to replace the Linear layers with dynamically
+                quantized int8 versions, see <quantize>.
+    """
+    model_name = "ProsusAI/finbert"
+
+    def __init__(self, encoder_reduction: BaseEncoderReduction = NumpyReduction(np.sum),
+        num_threads: int = None, num_interop_threads: int = None, quantize: bool = False,
+        **kwargs):
+
+        super().__init__(encoder_reduction, **kwargs)
+
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+
+        if num_interop_threads is not None:
+            torch.set_num_interop_threads(num_interop_threads)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+        self.quantized = False
+
+        if quantize:
+            self.quantize()
+
+    def set_num_threads(self, num_threads: int) -> None:
+        torch.set_num_threads(num_threads)
+
+    def share_memory(self) -> "PyTorchFinbert":
+        # Moves the weights to shared memory, so that processes receiving the encoder map them.
+        self.model.share_memory()
+        return self
+
+    def model_identity(self) -> str:
+        return f"{super().model_identity()}:{self.model_name}" + (":int8" if self.quantized else "")
+
+    def quantize(self, validation_texts: list = None, tolerance: float = .05) -> float:
+        """ Dynamically quantizes the Linear layers of the model to int8.
+        Args:
+            validation_texts (list): When specified, texts scored by both the fp32
+                    and the quantized model before the quantized model is kept.
+            tolerance (float): The maximum absolute score difference allowed on
+                    <validation_texts>.
+        Returns:
+            max_error (float): The maximum absolute score difference on
+                    <validation_texts>, or None when un-specified.
+        Raises:
+            QuantizationToleranceExceeded: The fp32 model is kept.
+        """
+        quantized_model = torch.quantization.quantize_dynamic(
+            self.model, { torch.nn.Linear }, dtype=torch.qint8
+        )
+
+        max_error = None
 
-        self.tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
-        self.model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
+        if validation_texts is not None:
+            fp32_scores = self.flat_encode(validation_texts)
+            fp32_model, self.model = self.model, quantized_model
+            max_error = float(np.max(np.abs(self.flat_encode(validation_texts) - fp32_scores)))
+            self.model = fp32_model
+
+            if max_error > tolerance:
+                raise QuantizationToleranceExceeded(max_error, tolerance)
+
+        self.model = quantized_model
+        self.quantized = True
+
+        return max_error
+
+    def score(self, inputs: dict) -> np.ndarray:
+        with torch.inference_mode(): # No autograd graph is recorded
+            outputs = self.model(**inputs)
+
+            # prediction probability distributed: positive (+1) / negative (-1) / neutral (0)
+            predictions = softmax(outputs.logits, dim=-1).numpy()
+
+        return predictions[:, 0] - predictions[:, 1]
 
     def flat_encode(self, flat_text_tensor: np.ndarray, **kwargs) -> np.ndarray:
         inputs = self.tokenizer(
-            flat_text_tensor,
+            [ str(text) for text in flat_text_tensor ],
             padding=True,
             truncation=True,
             return_tensors="pt"
         )
 
-        outputs = self.model(**inputs)
+        return self.score(inputs)
 
-        # prediction probability distributed: positive (+1) / negative (-1) / neutral (0)
-        predictions = softmax(outputs.logits, dim=-1).detach().numpy()
+    def tokenizer_identity(self) -> str:
+        return f"transformers:{self.model_name}"
 
-        return predictions[:, 0] - predictions[:, 1]
+    def pretokenize(self, flat_texts: list) -> list:
+        return self.tokenizer(flat_texts, truncation=True)["input_ids"]
+
+    def flat_encode_pretokenized(self, token_batch: dict, **kwargs) -> np.ndarray:
+        return self.score({ key: torch.from_numpy(values) for key, values in token_batch.items() })
+
+    def batched_flat_encode(self, flat_text_tensor: np.ndarray) -> np.ndarray:
+        # Tokenizes once, then pads each micro-batch only to its own longest input.
+        with self.instrumentation.stage("tokenization", len(flat_text_tensor)):
+            encodings = self.tokenizer(
+                [ str(text) for text in flat_text_tensor ],
+                truncation=True
+            )
+
+        token_lengths = np.array([ len(input_ids) for input_ids in encodings["input_ids"] ], dtype=int)
+
+        def encode_batch(batch_idx: np.ndarray) -> np.ndarray:
+            return self.score(self.tokenizer.pad({
+                key: [ values[idx] for idx in batch_idx ]
+                for key, values in encodings.items()
+            }, return_tensors="pt"))
+
+        return self.map_micro_batches(encode_batch, np.arange(token_lengths.size), token_lengths)
 
 if __name__ == "__main__":
     pass
@@ -2,77 +2,164 @@ import numpy as np
 
 from collections.abc import Iterable
 
-def padded_tensor_shape(ragged_tensor: Iterable) -> np.ndarray:
-    """ Returns the shape of the padded tensor given <ragged_tensor>.
+from ..text.ragged_sequences import RaggedSequences
+
+def is_ragged_leaf(ragged_tensor: any) -> bool:
+    return isinstance(ragged_tensor, str) or not isinstance(ragged_tensor, Iterable)
+
+def collect_ragged_leaves(ragged_tensor: Iterable) -> tuple:
+    """ Walks <ragged_tensor> once, collecting its leaves and their positions.
     Args:
         ragged_tensor (Iterable): An unevenly nested iterable.
     Returns:
-        shape (np.ndarray): The shape of the fully padded tensor.
+        leaves (list): The leaf values, in no particular order.
+        leaf_idx (list): The index tuple of each leaf; leaves above the last
+                dimension have shorter index tuples.
+        shape (list): The shape of the fully padded tensor.
     """
-    if isinstance(ragged_tensor, str) or not isinstance(ragged_tensor, Iterable):
-        return np.array([], dtype=int)
+    leaves, leaf_idx, shape = [], [], []
+    stack = [ (ragged_tensor, ()) ]
 
-    subtensor_shapes = [
-        padded_tensor_shape(ragged_subtensor)
-        for ragged_subtensor in ragged_tensor
+    while stack:
+        ragged_subtensor, subtensor_idx = stack.pop()
+
+        if is_ragged_leaf(ragged_subtensor):
+            leaves.append(ragged_subtensor)
+            leaf_idx.append(subtensor_idx)
+            continue
+
+        depth = len(subtensor_idx)
+        dim_size = ragged_subtensor.shape[0] \
+                if isinstance(ragged_subtensor, np.ndarray) else \
+                len(ragged_subtensor)
+
+        if depth == len(shape):
+            shape.append(dim_size)
+        elif shape[depth] < dim_size:
+            shape[depth] = dim_size
+
+        stack.extend(
+            (ragged_subsubtensor, (*subtensor_idx, idx))
+            for idx, ragged_subsubtensor in enumerate(ragged_subtensor)
+        )
+
+    return leaves, leaf_idx, shape
+
+def ragged_sequences_shape(ragged_sequences: RaggedSequences) -> list:
+    return [
+        int(np.diff(level_offsets).max(initial=0))
+        for level_offsets in ragged_sequences.offsets
     ]
 
-    max_dim = max([ shape.size for shape in subtensor_shapes ])
-    current_dim_size = len(subtensor_shapes)
+def ragged_sequences_leaf_idx(ragged_sequences: RaggedSequences, shape: list) -> tuple:
+    # The padded index of each value, computed level by level from the offsets.
+    flat_idx = np.zeros(1, dtype=np.int64)
+
+    for level_offsets, dim_size in zip(ragged_sequences.offsets, shape):
+        row_lengths = np.diff(level_offsets)
+        parent_idx = np.repeat(np.arange(row_lengths.size), row_lengths)
+        flat_idx = flat_idx[parent_idx] * dim_size \
+                + np.arange(parent_idx.size) - level_offsets[:-1][parent_idx] + level_offsets[0]
+
+    return np.unravel_index(flat_idx, shape)
+
+def ragged_segments(ragged_tensor: Iterable) -> tuple:
+    """ Flattens <ragged_tensor> for segment reductions, without padding.
+    Args:
+        ragged_tensor (Iterable): An unevenly nested iterable or RaggedSequences.
+    Returns:
+        values (np.ndarray): The leaf values, in row-major (padded) order.
+        segment_ids (np.ndarray): The top-level index of each value.
+        num_segments (int): The number of top-level sequences.
+    """
+    if isinstance(ragged_tensor, RaggedSequences):
+        segment_ids = np.arange(len(ragged_tensor))
+
+        for level_offsets in ragged_tensor.offsets[1:]:
+            segment_ids = np.repeat(segment_ids, np.diff(level_offsets))
+
+        return np.asarray(ragged_tensor.values), segment_ids, len(ragged_tensor)
 
-    tensor_shape = np.stack([
-        np.append(subtensor_shape, [0] * (max_dim - subtensor_shape.size))
-        for subtensor_shape in subtensor_shapes
-    ]).max(axis=0)
+    leaves, leaf_idx, shape = collect_ragged_leaves(ragged_tensor)
 
-    return np.append(
-        np.array([ current_dim_size ]),
-        tensor_shape
-    ).astype(int)
+    # The walk visits the leaves in reverse row-major order
+    return np.asarray(leaves[::-1]), np.array([ idx[0] for idx in leaf_idx[::-1] ], dtype=np.intp), \
+            shape[0] if shape else 0
+
+def padded_tensor_shape(ragged_tensor: Iterable) -> np.ndarray:
+    """ Returns the shape of the padded tensor given <ragged_tensor>.
+    Args:
+        ragged_tensor (Iterable): An unevenly nested iterable or RaggedSequences.
+    Returns:
+        shape (np.ndarray): The shape of the fully padded tensor.
+    """
+    if isinstance(ragged_tensor, RaggedSequences):
+        return np.array(ragged_sequences_shape(ragged_tensor), dtype=int)
+
+    if is_ragged_leaf(ragged_tensor):
+        return np.array([], dtype=int)
+
+    return np.array(collect_ragged_leaves(ragged_tensor)[2], dtype=int)
 
 def padded_tensor(ragged_tensor: Iterable, pad_value: any, dtype = None,
-    tensor_shape: np.ndarray = None) -> np.ndarray:
+    tensor_shape: np.ndarray = None, out: np.ndarray = None) -> np.ndarray:
     """ Pads <ragged_tensor> with <pad_value>.
     Args:
-        ragged_tensor (Iterable): An unevenly nested iterable.
+        ragged_tensor (Iterable): An unevenly nested iterable or RaggedSequences.
         pad_value (any): The value to pad the tensor with. Must be compatible
                 with the exisiting values of <ragged_batch> and <dtype>.
         dtype (type): The data type to cast the padded tensor to.
         tensor_shape (np.ndarray): The expected shape of the fully padded tensor.
-                When un-specified, calls <padded_tensor_shape> method to
-                determine the appropriate container for the tensor.
+                When un-specified, the shape found while walking <ragged_tensor>
+                is used.
+        out (np.ndarray): A buffer of the padded shape to fill in place.
     Returns:
-        shape (np.ndarray): The shape of the fully padded tensor.
+        padded_tensor (np.ndarray): The fully padded tensor.
     """
-    if tensor_shape is None: # Base dimension
-        tensor_shape = padded_tensor_shape(ragged_tensor)
-
-    if isinstance(ragged_tensor, str) or not isinstance(ragged_tensor, Iterable):
-        if not tensor_shape.size: # Last dimension
-            return ragged_tensor
-        
-        padded_ragged_batch = np.full(shape=tensor_shape,
-                fill_value=pad_value, dtype=dtype)
-        
-        padded_ragged_batch[tuple([0] * tensor_shape.size)] = ragged_tensor
-        return padded_ragged_batch
-    
-    current_dim_size = ragged_tensor.shape[0] \
-            if isinstance(ragged_tensor, np.ndarray) else \
-            len(ragged_tensor)
-
-    return np.concatenate([
-        np.stack([
-            padded_tensor(ragged_subtensor, pad_value=pad_value,
-                    tensor_shape=tensor_shape[1:])
-            for ragged_subtensor in ragged_tensor
-        ], axis=0),
-        np.full(
-            shape=[ tensor_shape[0] - current_dim_size, *tensor_shape[1:] ],
-            fill_value=pad_value,
-            dtype=dtype
-        )
-    ])
+    if isinstance(ragged_tensor, RaggedSequences):
+        leaves = ragged_tensor.values
+        shape = ragged_sequences_shape(ragged_tensor)
+        leaf_idx = None
+    elif is_ragged_leaf(ragged_tensor):
+        return ragged_tensor
+    else:
+        leaves, leaf_idx, shape = collect_ragged_leaves(ragged_tensor)
+
+    if tensor_shape is not None:
+        assert len(tensor_shape) == len(shape) and all(np.greater_equal(tensor_shape, shape)), f"""
+            Incompatible Shape:
+            Cannot pad <ragged_tensor> of padded shape {shape} to {list(tensor_shape)}.
+        """
+
+        shape = [ int(dim_size) for dim_size in tensor_shape ]
+
+    if leaf_idx is None:
+        leaf_idx = ragged_sequences_leaf_idx(ragged_tensor, shape)
+    elif leaf_idx:
+        leaf_idx = tuple(np.array([ # Leaves above the last dimension sit at index 0
+            (*idx, *[0] * (len(shape) - len(idx))) for idx in leaf_idx
+        ], dtype=np.intp).T)
+    else:
+        leaf_idx = tuple(np.zeros((len(shape), 0), dtype=np.intp))
+
+    leaves = np.asarray(leaves, dtype=dtype) if len(leaves) else np.zeros(0, dtype=dtype)
+
+    if out is None:
+        out_dtype = dtype if dtype is not None else \
+                np.result_type(leaves, np.asarray(pad_value)) if leaves.size else \
+                np.asarray(pad_value).dtype
+
+        out = np.full(shape, pad_value, dtype=out_dtype)
+    else:
+        assert list(out.shape) == shape, f"""
+            Incompatible Buffer:
+            Cannot fill <out> of shape {out.shape} with padded shape {shape}.
+        """
+
+        out[...] = pad_value
+
+    out[leaf_idx] = leaves
+    return out
 
 if __name__ == "__main__":
     pass
@@ -1,3 +1,5 @@
+import time
+import hashlib
 import pandas as pd
 import numpy as np
 import tensorflow as tf
@@ -9,7 +11,10 @@ from official.nlp import optimization
 from tensorflow.keras.losses import MeanSquaredError
 
 from .base import BaseTextEncoder
+from .pretokenized import PretokenizedDataset
 from .encoder_reduction.tensorflow import TensorflowReduction
+from .tensorflow_distribute import is_multi_worker
+from .tensorflow_checkpoint import AsyncCheckpointManager
 
 def adamw_optimizer(num_train_steps: int, warmup_ratio: float = .1,
     init_learning_rate: float = 3e-5):
@@ -24,92 +29,464 @@ def adamw_optimizer(num_train_steps: int, warmup_ratio: float = .1,
         optimizer_type="adamw"
     )
 
+def per_example_loss_fn(loss_fn: tf.keras.losses.Loss) -> tf.keras.losses.Loss:
+    # A copy of <loss_fn> without reduction, for losses averaged over the global batch.
+    return type(loss_fn).from_config({ **loss_fn.get_config(),
+            "reduction": tf.keras.losses.Reduction.NONE })
+
 class BaseTensorflowTextEncoder (BaseTextEncoder): 
+    """ Trainable TensorFlow text encoder.
+    Args:
+        encoder_reduction (TensorflowReduction): Reduces the padded outputs.
+        dtype (type): The dtype of the outputs and weights.
+        strategy (tf.distribute.Strategy): The distribution strategy the
+                model variables are created and trained under; defaults to the
+                current strategy.
+    """
     def __init__(self, encoder_reduction: TensorflowReduction = TensorflowReduction(tf.reduce_sum),
-        dtype: type = tf.float32) -> None:
+        dtype: type = tf.float32, strategy: tf.distribute.Strategy = None, **kwargs) -> None:
 
-        super().__init__(encoder_reduction)
+        super().__init__(encoder_reduction, **kwargs)
         self.dtype = dtype
+        self.strategy = tf.distribute.get_strategy() if strategy is None else strategy
 
     @abstractmethod
     def trainable_variables(self):
         raise NotImplementedError()
 
+    def model_identity(self) -> str:
+        # Trainable weights are part of the identity, so fine-tuned outputs are cached apart.
+        if getattr(self, "weights_fingerprint", None) is None:
+            fingerprint = hashlib.blake2b(digest_size=16)
+
+            for variable in self.trainable_variables():
+                fingerprint.update(variable.name.encode("utf-8"))
+                fingerprint.update(np.ascontiguousarray(variable.numpy()).tobytes())
+
+            self.weights_fingerprint = fingerprint.hexdigest()
+
+        return f"{super().model_identity()}:{self.weights_fingerprint}"
+
     def pad_inputs(self, text_inputs: Iterable, text_weights: Iterable = None) -> tuple:
         text_tensor, weight_tensor = super().pad_inputs(text_inputs, text_weights)
 
         return tf.convert_to_tensor(text_tensor, dtype=tf.dtypes.string), \
-                tf.convert_to_tensor(weight_tensor, dtypes=self.dtype)
+                tf.convert_to_tensor(weight_tensor, dtype=self.dtype)
+
+    def pad_pretokenized(self, dataset: PretokenizedDataset) -> tuple:
+        # <pad_inputs> for pre-tokenized inputs: each text cell holds its padded token ids.
+        token_tensors, weight_tensor = dataset.padded_token_tensors()
+
+        return { key: tf.convert_to_tensor(token_tensor, dtype=tf.int32)
+                for key, token_tensor in token_tensors.items() }, \
+                tf.convert_to_tensor(weight_tensor, dtype=self.dtype)
 
     @abstractmethod
     def flat_encode(self, flat_text_tensor: tf.Tensor, **kwargs) -> tf.Tensor:
         raise NotImplementedError()
 
-    def flat_map_encode(self, text_tensor: tf.Tensor, **kwargs) -> tf.Tensor:
+    def flat_map_encode(self, text_tensor: any, **kwargs) -> tf.Tensor:
+        if isinstance(text_tensor, dict): # Padded token tensors of <pad_pretokenized>
+            return tf.reshape(
+                self.flat_encode_pretokenized({
+                    key: tf.reshape(token_tensor, [-1, tf.shape(token_tensor)[-1]])
+                    for key, token_tensor in text_tensor.items()
+                }, **kwargs),
+                tf.shape(text_tensor["input_ids"])[:-1]
+            )
+
         return tf.reshape(
             self.flat_encode(tf.reshape(text_tensor, [-1]), **kwargs),
-            text_tensor.shape
+            tf.shape(text_tensor) # The batch dimension is unknown when traced from tf.data
         )
 
+    def ragged_flat_map_encode(self, text_tensor: any, weight_tensor: any, **kwargs) -> tf.Tensor:
+        # As a tensor, for <TensorflowReduction>
+        return tf.convert_to_tensor(super().ragged_flat_map_encode(text_tensor, weight_tensor, **kwargs),
+                dtype=self.dtype)
+
+    def pad_pretokenized_outputs(self, dataset: PretokenizedDataset, entry_outputs: np.ndarray) -> tuple:
+        output_tensor, weight_tensor = super().pad_pretokenized_outputs(dataset, entry_outputs)
+
+        return tf.convert_to_tensor(output_tensor, dtype=self.dtype), \
+                tf.convert_to_tensor(weight_tensor, dtype=self.dtype)
+
     def encode(self, text_inputs: Iterable, text_weights: Iterable = None, **kwargs) -> any:
-        return super().encode(text_inputs, text_weights, **kwargs).numpy()
+        output_tensor = super().encode(text_inputs, text_weights, **kwargs)
+
+        # Segment reductions over NumPy inputs may return arrays
+        return output_tensor.numpy() if tf.is_tensor(output_tensor) else np.asarray(output_tensor)
+
+    def batch_loss(self, output_tensor: tf.Tensor, text_tensor: any, weight_tensor: tf.Tensor,
+        loss_fn: callable, global_batch_size: int = None, **kwargs) -> tf.Tensor:
+        """ The loss of a (replica) batch. With <global_batch_size>, <loss_fn> returns
+        per-example losses, which are averaged over the global batch so that the
+        replica losses (and gradients) sum to those of the global batch.
+        """
+        predicted_tensor = self.reduce_output(self.flat_map_encode(text_tensor, **kwargs), weight_tensor)
+
+        if global_batch_size is None:
+            return loss_fn(output_tensor, predicted_tensor)
+
+        if output_tensor.shape.rank == 1: # One loss per example rather than one per batch
+            output_tensor, predicted_tensor = output_tensor[:, None], predicted_tensor[:, None]
+
+        return tf.nn.compute_average_loss(loss_fn(output_tensor, predicted_tensor),
+                global_batch_size=global_batch_size)
 
     @tf.function
     def train_on_batch(self, output_tensor: tf.Tensor, text_tensor: tf.Tensor, weight_tensor: tf.Tensor,
-        optimizer, loss_fn: callable, **kwargs) -> tf.Tensor:
+        optimizer, loss_fn: callable, global_batch_size: int = None, **kwargs) -> tf.Tensor:
+
+        def replica_train_step(output_tensor, text_tensor, weight_tensor) -> tf.Tensor:
+            with tf.GradientTape() as tape:
+                current_batch_loss = self.batch_loss(output_tensor, text_tensor, weight_tensor,
+                        loss_fn, global_batch_size, **kwargs)
 
-        with tf.GradientTape() as tape:
-            current_batch_loss = loss_fn(output_tensor, self.reduce_output(self.flat_map_encode(
-                        text_tensor, **kwargs), weight_tensor))
-            
             gradients = tape.gradient(current_batch_loss, self.trainable_variables())
             optimizer.apply_gradients(zip(gradients, self.trainable_variables()))
 
-        return current_batch_loss
+            return current_batch_loss
+
+        return self.strategy.reduce(tf.distribute.ReduceOp.SUM, self.strategy.run(
+            replica_train_step, args=(output_tensor, text_tensor, weight_tensor)
+        ), axis=None)
+
+    def checkpoint_objects(self) -> dict:
+        # The trackable objects saved in training checkpoints; override to save whole models.
+        return { "variables": self.trainable_variables() }
+
+    @tf.function
+    def accumulate_on_batch(self, output_tensor: tf.Tensor, text_tensor: tf.Tensor, weight_tensor: tf.Tensor,
+        loss_fn: callable, global_batch_size: int = None, **kwargs) -> tf.Tensor:
+
+        def replica_accumulate_step(output_tensor, text_tensor, weight_tensor) -> tf.Tensor:
+            with tf.GradientTape() as tape:
+                current_batch_loss = self.batch_loss(output_tensor, text_tensor, weight_tensor,
+                        loss_fn, global_batch_size, **kwargs)
+
+            gradients = tape.gradient(current_batch_loss, self.trainable_variables())
+
+            for gradient_accumulator, gradient in zip(self.gradient_accumulators, gradients):
+                if gradient is not None:
+                    gradient_accumulator.assign_add(tf.convert_to_tensor(gradient))
+
+            return current_batch_loss
+
+        return self.strategy.reduce(tf.distribute.ReduceOp.SUM, self.strategy.run(
+            replica_accumulate_step, args=(output_tensor, text_tensor, weight_tensor)
+        ), axis=None)
+
+    @tf.function
+    def apply_accumulated_gradients(self, optimizer, num_accumulated: tf.Tensor) -> None:
+        def replica_apply_step() -> None:
+            # Each replica applies its local sums; the optimizer all-reduces them
+            optimizer.apply_gradients([
+                (gradient_accumulator / tf.cast(num_accumulated, gradient_accumulator.dtype), variable)
+                for gradient_accumulator, variable in zip(self.gradient_accumulators, self.trainable_variables())
+            ])
+
+            for gradient_accumulator in self.gradient_accumulators:
+                gradient_accumulator.assign(tf.zeros_like(gradient_accumulator))
+
+        self.strategy.run(replica_apply_step)
+
+    def prepare_batch(self, text_tensor: any) -> any:
+        # Runs in the tf.data pipeline, in parallel with training steps; override to e.g. tokenize.
+        return text_tensor
+
+    def training_dataset(self, output_tensor: tf.Tensor, text_tensor: any, weight_tensor: tf.Tensor,
+        batch_size: int, shuffle_seed: int = None, skip_batches: int = 0) -> tf.data.Dataset:
+        """ Shuffled batches of (outputs, prepared texts, weights), prepared in
+        parallel and prefetched while the previous step runs. With <shuffle_seed>,
+        the batch order is reproducible, so that <skip_batches> can resume an epoch.
+        """
+        dataset = tf.data.Dataset.from_tensor_slices((output_tensor, text_tensor, weight_tensor)) \
+                .shuffle(output_tensor.shape[0], seed=shuffle_seed,
+                        reshuffle_each_iteration=shuffle_seed is None) \
+                .batch(batch_size) \
+                .skip(skip_batches) \
+                .map(lambda output_batch, text_batch, weight_batch: (
+                    output_batch, self.prepare_batch(text_batch), weight_batch
+                ), num_parallel_calls=tf.data.AUTOTUNE) \
+                .prefetch(tf.data.AUTOTUNE)
+
+        if self.strategy.num_replicas_in_sync == 1:
+            return dataset
+
+        # Every worker builds the same batches and keeps its replicas' share of each
+        options = tf.data.Options()
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+
+        return self.strategy.experimental_distribute_dataset(dataset.with_options(options))
+
+    @tf.function
+    def evaluate_on_batch(self, output_tensor: tf.Tensor, text_tensor: tf.Tensor, weight_tensor: tf.Tensor,
+        loss_fn: callable, **kwargs) -> tf.Tensor:
+        # Inference only: no gradients are recorded
+        return loss_fn(output_tensor, self.reduce_output(self.flat_map_encode(
+                text_tensor, **kwargs), weight_tensor))
+
+    def evaluate(self, output_tensor: tf.Tensor, text_tensor: any, weight_tensor: tf.Tensor,
+        loss_fn: callable, batch_size: int = 256, **kwargs) -> float:
+        # The loss over all inputs, averaged from the losses of large batches by batch size.
+        dataset = tf.data.Dataset.from_tensor_slices((output_tensor, text_tensor, weight_tensor)) \
+                .batch(batch_size) \
+                .map(lambda output_batch, text_batch, weight_batch: (
+                    output_batch, self.prepare_batch(text_batch), weight_batch
+                ), num_parallel_calls=tf.data.AUTOTUNE) \
+                .prefetch(tf.data.AUTOTUNE)
+
+        total_loss = tf.add_n([
+            self.evaluate_on_batch(output_batch, text_batch, weight_batch, loss_fn=loss_fn, **kwargs) * \
+                    tf.cast(tf.shape(output_batch)[0], self.dtype)
+            for output_batch, text_batch, weight_batch in dataset
+        ])
+
+        return float(total_loss.numpy()) / output_tensor.shape[0]
 
     def train(self, encoded_outputs: np.ndarray, text_inputs: Iterable,  text_weights: Iterable,
         batch_size: int = 4, epochs: int = 100, optimizer = None, evaluation_split: float = 0.,
-        loss_fn: callable = MeanSquaredError(), **kwargs) -> pd.DataFrame:
+        loss_fn: callable = MeanSquaredError(), accumulation_steps: int = 1, checkpoint_dpath: str = None,
+        checkpoint_interval: int = None, max_checkpoints: int = 3, seed: int = None,
+        evaluation_batch_size: int = 256, patience: int = None, min_delta: float = 0.,
+        restore_best_weights: bool = True, **kwargs) -> any:
+        """ Fine-tunes the encoder so that <encode> of <text_inputs> fits <encoded_outputs>.
+        Args:
+            batch_size (int): The inputs per batch.
+            accumulation_steps (int): The batches whose gradients are averaged
+                    into each optimizer update, for an effective batch size of
+                    <batch_size> x <accumulation_steps>.
+            checkpoint_dpath (str): When specified, the model, optimizer and
+                    progress are checkpointed to <checkpoint_dpath> every
+                    <checkpoint_interval> optimizer updates and every epoch, and
+                    training resumes from the latest checkpoint found there.
+                    Checkpoints are written asynchronously, see
+                    <AsyncCheckpointManager>.
+            max_checkpoints (int): The number of checkpoints kept.
+            seed (int): The shuffle and evaluation split seed; drawn at random
+                    (and checkpointed) when un-specified.
+            evaluation_split (float): The fraction of inputs held out and scored
+                    after each epoch, in batches of <evaluation_batch_size>.
+            patience (int): When specified, training stops once the evaluation
+                    loss has not improved by more than <min_delta> for <patience>
+                    epochs.
+            restore_best_weights (bool): Whether to end training with the
+                    weights of the epoch with the lowest evaluation loss; the
+                    best weights are checkpointed with the progress.
+
+        Under a strategy with several replicas, <batch_size> is the global
+        batch size, <loss_fn> (a tf.keras.losses.Loss) is averaged over the
+        global batch, and only the chief keeps checkpoints. A custom
+        <optimizer> must be created under <strategy.scope()>.
 
+        Progress is reported to <instrumentation> rather than stdout: a
+        "train_epoch" record with the mean batch loss of each epoch, an
+        "evaluate" record with the evaluation loss, and "resume" and
+        "early_stopping" records.
+        Returns:
+            training_loss (pd.DataFrame): The loss of each batch trained in
+                    this call, by epoch.
+            evaluation_loss (pd.Series): The evaluation loss of each epoch
+                    trained in this call, returned only if <evaluation_split> > 0.
+        """
         if optimizer is None: # Use default AdamW optimizer
             num_train_steps = epochs * encoded_outputs.shape[0]
-            optimizer=adamw_optimizer(num_train_steps=num_train_steps)
+
+            with self.strategy.scope():
+                optimizer=adamw_optimizer(num_train_steps=num_train_steps)
+
+        global_batch_size = None
+        original_loss_fn = loss_fn # Evaluation runs unreplicated, with the batch-averaged loss
+
+        if self.strategy.num_replicas_in_sync > 1:
+            global_batch_size = batch_size
+            loss_fn = per_example_loss_fn(loss_fn)
+
+        if seed is None and is_multi_worker(self.strategy):
+            seed = 0 # Workers must shuffle and split alike
 
         # Converting inputs and outputs to tensors
-        text_tensor, weight_tensor = self.pad_inputs(text_inputs, text_weights)
+        if isinstance(text_inputs, PretokenizedDataset): # <text_weights> are stored in the dataset
+            text_tensor, weight_tensor = self.pad_pretokenized(text_inputs)
+        else:
+            text_tensor, weight_tensor = self.pad_inputs(text_inputs, text_weights)
+
         output_tensor = tf.convert_to_tensor(encoded_outputs, dtype=self.dtype)
 
+        if accumulation_steps > 1 and getattr(self, "gradient_accumulators", None) is None:
+            # Created once: the traced <accumulate_on_batch> keeps the first variables it sees
+            with self.strategy.scope(): # One local accumulator per replica
+                self.gradient_accumulators = [
+                    tf.Variable(tf.zeros_like(variable), trainable=False,
+                            synchronization=tf.VariableSynchronization.ON_READ,
+                            aggregation=tf.VariableAggregation.SUM)
+                    for variable in self.trainable_variables()
+                ]
+
+        # Training progress: the epoch and the batches of it already trained
+        epoch_progress = tf.Variable(0, dtype=tf.int64, trainable=False)
+        batch_progress = tf.Variable(0, dtype=tf.int64, trainable=False)
+        shuffle_seed = tf.Variable(np.random.randint(2 ** 31) if seed is None else seed,
+                dtype=tf.int64, trainable=False)
+
+        # Early stopping progress
+        best_evaluation_loss = tf.Variable(np.inf, dtype=tf.float64, trainable=False)
+        epochs_without_improvement = tf.Variable(0, dtype=tf.int64, trainable=False)
+        best_weights = []
+
+        if evaluation_split > 0 and restore_best_weights: # Checkpointed, so they survive resuming
+            with self.strategy.scope():
+                best_weights = [
+                    tf.Variable(variable.read_value(), trainable=False)
+                    for variable in self.trainable_variables()
+                ]
+
+        checkpoint_manager = None
+
+        if checkpoint_dpath is not None:
+            checkpoint = tf.train.Checkpoint(optimizer=optimizer, epoch=epoch_progress,
+                    batch=batch_progress, seed=shuffle_seed, best_evaluation_loss=best_evaluation_loss,
+                    epochs_without_improvement=epochs_without_improvement, best_weights=best_weights,
+                    **self.checkpoint_objects())
+            checkpoint_manager = AsyncCheckpointManager(checkpoint, checkpoint_dpath, self.strategy,
+                    max_to_keep=max_checkpoints)
+            latest_checkpoint = tf.train.latest_checkpoint(checkpoint_dpath) # Written by the chief
+
+            if latest_checkpoint is not None:
+                checkpoint.restore(latest_checkpoint)
+                self.instrumentation.emit({ "stage": "resume", "num_items": 0, "checkpoint": latest_checkpoint,
+                        "epoch": int(epoch_progress.numpy()), "batch": int(batch_progress.numpy()) })
+
+        # Holding out the evaluation split, drawn from the (checkpointed) seed
         dataset_size = encoded_outputs.shape[0]
-        dataset_idx = tf.range(0, dataset_size)
-        training_loss = []
+        evaluation_size = int(evaluation_split * dataset_size)
+        shuffled_idx = np.random.default_rng(int(shuffle_seed.numpy())).permutation(dataset_size)
+
+        split_tensors = lambda idx: tuple(tf.nest.map_structure(
+            lambda tensor: tf.gather(tensor, idx, axis=0), (output_tensor, text_tensor, weight_tensor)
+        ))
+
+        if evaluation_size > 0:
+            evaluation_tensors = split_tensors(shuffled_idx[:evaluation_size])
+            output_tensor, text_tensor, weight_tensor = split_tensors(shuffled_idx[evaluation_size:])
+
+        num_batches = -(-(dataset_size - evaluation_size) // batch_size)
+        evaluation_loss = {}
+        training_loss = {}
+        num_updates = 0
+
+        for epoch in range(int(epoch_progress.numpy()), epochs):
+            epoch_start_time = time.perf_counter()
+            skip_batches = int(batch_progress.numpy())
+            dataset = self.training_dataset(output_tensor, text_tensor, weight_tensor, batch_size,
+                    shuffle_seed=int(shuffle_seed.numpy()) + epoch, skip_batches=skip_batches)
 
-        for epoch in range(epochs):
-            shuffled_idx = tf.random.shuffle(dataset_idx)
             training_batch_loss = []
+            num_accumulated = 0
+
+            for batch_idx, (output_batch, text_batch, weight_batch) in enumerate(tqdm(
+                dataset, total=num_batches - skip_batches, desc=f"Epoch{epoch + 1:>5}/{epochs:>5}"
+            ), start=skip_batches):
 
-            for frm_idx in tqdm(range(0, dataset_size, batch_size), desc=f"Epoch{epoch + 1:>5}/{epochs:>5}"):
-                to_idx = min(frm_idx + batch_size, dataset_size)
+                with self.instrumentation.stage("train_step",
+                    min(batch_size, dataset_size - evaluation_size - batch_idx * batch_size),
+                    epoch=epoch, batch=batch_idx):
 
-                training_batch_loss.append(
-                    self.train_on_batch(
-                        tf.gather(output_tensor, shuffled_idx[frm_idx:to_idx], axis=0),
-                        tf.gather(text_tensor,   shuffled_idx[frm_idx:to_idx], axis=0),
-                        tf.gather(weight_tensor, shuffled_idx[frm_idx:to_idx], axis=0),
-                        optimizer=optimizer,
-                        loss_fn=loss_fn,
-                        **kwargs
-                    ).numpy()
-                )
+                    if accumulation_steps > 1:
+                        training_batch_loss.append(self.accumulate_on_batch(
+                            output_batch, text_batch, weight_batch, loss_fn=loss_fn,
+                            global_batch_size=global_batch_size, **kwargs
+                        ))
 
-            training_batch_loss = np.array(training_batch_loss)
-            print(f" Loss:={np.mean(training_batch_loss)}")
+                        num_accumulated += 1
 
-            training_loss.append(training_batch_loss)
+                        if num_accumulated == accumulation_steps or batch_idx + 1 == num_batches:
+                            self.apply_accumulated_gradients(optimizer, tf.constant(num_accumulated))
+                            num_accumulated = 0
+                    else:
+                        training_batch_loss.append(self.train_on_batch(
+                            output_batch, text_batch, weight_batch,
+                            optimizer=optimizer,
+                            loss_fn=loss_fn,
+                            global_batch_size=global_batch_size,
+                            **kwargs
+                        ))
 
-        training_loss = pd.DataFrame(np.stack(training_loss))
+                if num_accumulated: # Mid-way through an accumulated update
+                    continue
+
+                num_updates += 1
+                batch_progress.assign(batch_idx + 1)
+
+                if checkpoint_manager is not None and checkpoint_interval is not None and \
+                    num_updates % checkpoint_interval == 0 and batch_idx + 1 < num_batches:
+                    checkpoint_manager.save()
+
+            # Losses stay on device until the end of the epoch: a single host sync
+            training_batch_loss = tf.stack(training_batch_loss).numpy()
+
+            epoch_wall_time = time.perf_counter() - epoch_start_time
+            self.instrumentation.emit({ "stage": "train_epoch", "epoch": epoch,
+                    "num_items": len(training_batch_loss), "loss": float(np.mean(training_batch_loss)),
+                    "wall_time": epoch_wall_time, "throughput": len(training_batch_loss) / epoch_wall_time })
+
+            # Batches trained before resuming are left missing
+            training_loss[epoch] = np.concatenate([ np.full(skip_batches, np.nan), training_batch_loss ])
+
+            stop_training = False
+
+            if evaluation_size > 0:
+                with self.instrumentation.stage("evaluate", evaluation_size, epoch=epoch) as record:
+                    evaluation_loss[epoch] = self.evaluate(*evaluation_tensors, loss_fn=original_loss_fn,
+                            batch_size=evaluation_batch_size, **kwargs)
+
+                    record["loss"] = evaluation_loss[epoch]
+
+                if evaluation_loss[epoch] < best_evaluation_loss.numpy() - min_delta:
+                    best_evaluation_loss.assign(evaluation_loss[epoch])
+                    epochs_without_improvement.assign(0)
+
+                    for best_variable, variable in zip(best_weights, self.trainable_variables()):
+                        best_variable.assign(variable)
+                else:
+                    epochs_without_improvement.assign_add(1)
+                    stop_training = patience is not None and epochs_without_improvement.numpy() >= patience
+
+            epoch_progress.assign(epochs if stop_training else epoch + 1)
+            batch_progress.assign(0)
+
+            if checkpoint_manager is not None:
+                checkpoint_manager.save()
+
+            if stop_training:
+                self.instrumentation.emit({ "stage": "early_stopping", "num_items": 0, "epoch": epoch,
+                        "patience": patience, "best_loss": float(best_evaluation_loss.numpy()) })
+                break
+
+        if best_weights and np.isfinite(best_evaluation_loss.numpy()): # Possibly from before resuming
+            for variable, best_variable in zip(self.trainable_variables(), best_weights):
+                variable.assign(best_variable)
+
+            if checkpoint_manager is not None: # The latest checkpoint holds the best weights
+                checkpoint_manager.save()
+
+        if checkpoint_manager is not None:
+            checkpoint_manager.close() # Waits for the pending write
+
+        # New weights, new <model_identity>: cached outputs of the old weights are no longer read
+        self.weights_fingerprint = None
+
+        training_loss = pd.DataFrame.from_dict(training_loss, orient="index")
         training_loss.columns.name = "Batch"
         training_loss.index.name = "Epoch"
 
+        if evaluation_size > 0:
+            evaluation_loss = pd.Series(evaluation_loss, name="Evaluation Loss", dtype=float)
+            evaluation_loss.index.name = "Epoch"
+
+            return training_loss, evaluation_loss
+
         return training_loss
 
 if __name__ == "__main__":
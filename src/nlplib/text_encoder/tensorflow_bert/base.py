@@ -6,20 +6,37 @@ from .namespace import get_bert_encoder, get_bert_preprocessor
 from ..tensorflow_base import BaseTensorflowTextEncoder
 from ..encoder_reduction.tensorflow import TensorflowReduction
 
+# <PretokenizedDataset.token_batch> keys -> TF Hub BERT encoder input names
+MAP_TOKEN_INPUT_TO_HUB = {
+    "input_ids": "input_word_ids",
+    "attention_mask": "input_mask",
+    "token_type_ids": "input_type_ids"
+}
+
 class TensorflowBert (BaseTensorflowTextEncoder):
     def __init__(self, bert_handle_name: str, encoder_reduction: TensorflowReduction = TensorflowReduction(tf.reduce_sum),
         dtype: type = tf.float32, **kwargs):
 
-        super(TensorflowBert, self).__init__(encoder_reduction, dtype)
-        self.bert_model = self.build_bert_model(bert_handle_name)
+        super(TensorflowBert, self).__init__(encoder_reduction, dtype, **kwargs)
+        self.bert_handle_name = bert_handle_name
+
+        with self.strategy.scope(): # Mirrors the variables across the strategy's replicas
+            self.bert_model = self.build_bert_model(bert_handle_name)
+
+    def model_identity(self) -> str:
+        return f"{super().model_identity()}:{self.bert_handle_name}"
 
     def build_bert_model(self, bert_handle_name: str):
         preprocessing_layer = get_bert_preprocessor(bert_handle_name, name="preprocessing")
         encoder_layer = get_bert_encoder(bert_handle_name, trainable=True, name="encoder")
 
-        text_input = tf_layers.Input(shape=(), dtype=tf.string, name="text")
-        encoder_inputs = preprocessing_layer(text_input)
-        encoder_outputs = encoder_layer(encoder_inputs)
+        # Token ids -> score; nested so that pre-tokenized inputs can skip the preprocessor
+        token_inputs = {
+            input_name: tf_layers.Input(shape=(None, ), dtype=tf.int32, name=input_name)
+            for input_name in ("input_word_ids", "input_mask", "input_type_ids")
+        }
+
+        encoder_outputs = encoder_layer(token_inputs)
         pooled_encoder_outputs = encoder_outputs["pooled_output"]
         custom_outputs = self.stack_custom_layers(pooled_encoder_outputs)
 
@@ -28,7 +45,10 @@ class TensorflowBert (BaseTensorflowTextEncoder):
             dtype=self.dtype
         )(custom_outputs)
 
-        return tf.keras.Model(text_input, score_output)
+        token_model = tf.keras.Model(token_inputs, score_output, name="token_model")
+
+        text_input = tf_layers.Input(shape=(), dtype=tf.string, name="text")
+        return tf.keras.Model(text_input, token_model(preprocessing_layer(text_input)))
 
     def stack_custom_layers(self, pooled_encoder_outputs: tf_layers.Layer) -> tf_layers.Layer:
         # override this method to set custom layers
@@ -37,9 +57,41 @@ class TensorflowBert (BaseTensorflowTextEncoder):
     def trainable_variables(self) -> list:
         return self.bert_model.trainable_variables
 
+    def checkpoint_objects(self) -> dict:
+        return { "model": self.bert_model }
+
     def flat_encode(self, flat_text_tensor: tf.Tensor) -> tf.Tensor:
         return self.bert_model(flat_text_tensor)
 
+    def tokenizer_identity(self) -> str:
+        return f"tfhub:{self.bert_handle_name}"
+
+    def pretokenize(self, flat_texts: list) -> list:
+        encoder_inputs = self.bert_model.get_layer("preprocessing")(tf.constant(flat_texts))
+        token_ids = encoder_inputs["input_word_ids"].numpy()
+        token_lengths = encoder_inputs["input_mask"].numpy().sum(axis=1)
+
+        return [ text_token_ids[:token_length] for text_token_ids, token_length in zip(token_ids, token_lengths) ]
+
+    def flat_encode_pretokenized(self, token_batch: dict, **kwargs) -> tf.Tensor:
+        return self.bert_model.get_layer("token_model")({
+            hub_input_name: tf.cast(token_batch[input_name], tf.int32)
+            for input_name, hub_input_name in MAP_TOKEN_INPUT_TO_HUB.items()
+        })
+
+    def prepare_batch(self, text_tensor: any) -> any:
+        # Tokenizes text batches in the training input pipeline rather than in the train step.
+        if isinstance(text_tensor, dict):
+            return text_tensor
+
+        encoder_inputs = self.bert_model.get_layer("preprocessing")(tf.reshape(text_tensor, [-1]))
+        token_shape = tf.concat([ tf.shape(text_tensor), [-1] ], axis=0)
+
+        return {
+            input_name: tf.reshape(encoder_inputs[hub_input_name], token_shape)
+            for input_name, hub_input_name in MAP_TOKEN_INPUT_TO_HUB.items()
+        }
+
     # Saving and restoring tensorflow models: overriding Pickable methods
     def get_bert_fpath(self, fpath: str) -> str:
         fname, _ = os.path.splitext(fpath)
@@ -51,6 +103,26 @@ class TensorflowBert (BaseTensorflowTextEncoder):
 
     def restore_unpickable_attrs(self, fpath: str) -> None:
         self.bert_model = tf.keras.models.load_model(self.get_bert_fpath(fpath))
+        self.weights_fingerprint = None
+
+        if "token_model" not in [ layer.name for layer in self.bert_model.layers ]:
+            self.bert_model = self.nest_token_model(self.bert_model)
+
+    @staticmethod
+    def nest_token_model(bert_model: tf.keras.Model) -> tf.keras.Model:
+        # Rebuilds models saved before the "token_model" nesting, sharing their layers.
+        try:
+            token_model = tf.keras.Model(bert_model.get_layer("encoder").input, bert_model.output,
+                    name="token_model")
+            text_input = tf_layers.Input(shape=(), dtype=tf.string, name="text")
+
+            return tf.keras.Model(text_input, token_model(bert_model.get_layer("preprocessing")(text_input)))
+        except (ValueError, AttributeError, TypeError) as exception:
+            raise ValueError(
+                "Incompatible saved model: it predates the nested \"token_model\" layer read by "
+                "pre-tokenized inputs and <prepare_batch>, and its layers could not be re-nested. "
+                "Build a new TensorflowBert and load the old weights into it."
+            ) from exception
 
 if __name__ == "__main__":
     pass
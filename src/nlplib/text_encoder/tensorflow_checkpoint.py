@@ -0,0 +1,129 @@
+import os
+import uuid
+import threading
+import tensorflow as tf
+
+from .tensorflow_distribute import is_chief, worker_checkpoint_dpath
+
+def async_checkpoint_options() -> tf.train.CheckpointOptions:
+    # Native asynchronous checkpoint writes (TensorFlow >= 2.12), otherwise None.
+    try:
+        return tf.train.CheckpointOptions(experimental_enable_async_checkpoint=True)
+    except TypeError:
+        return None
+
+class AsyncCheckpointManager:
+    """ tf.train.CheckpointManager whose writes overlap training.
+
+    With TensorFlow >= 2.12, checkpoints are written with the native
+    asynchronous CheckpointOptions. Otherwise (e.g. the pinned 2.8), <save>
+    serializes the checkpoint into host memory (TensorFlow's ram:// file
+    system) before returning, and a background thread copies it into
+    <checkpoint_dpath>. One write is in flight at a time: <save> and <sync>
+    wait for the previous one.
+
+    Every worker takes part in saving, but only the chief's checkpoints are
+    kept; the checkpoint state file is written last, so <checkpoint_dpath>
+    never lists a partly written checkpoint.
+
+    Args:
+        checkpoint (tf.train.Checkpoint): The checkpointed objects.
+        checkpoint_dpath (str): The directory the checkpoints are kept in.
+        strategy (tf.distribute.Strategy): The strategy of the checkpointed variables.
+        max_to_keep (int): The number of checkpoints kept.
+    """
+    def __init__(self, checkpoint: tf.train.Checkpoint, checkpoint_dpath: str,
+        strategy: tf.distribute.Strategy, max_to_keep: int = 3) -> None:
+
+        self.checkpoint = checkpoint
+        self.checkpoint_dpath = checkpoint_dpath
+        self.keep_checkpoints = is_chief(strategy)
+        self.checkpoint_options = async_checkpoint_options()
+        self.write_thread = None
+        self.write_error = None
+
+        if self.checkpoint_options is None: # Saved into host memory, then copied to disk
+            manager_dpath = f"ram://nlplib_checkpoints/{uuid.uuid4().hex}"
+            state_fpath = os.path.join(checkpoint_dpath, "checkpoint")
+            tf.io.gfile.makedirs(manager_dpath)
+
+            if self.keep_checkpoints:
+                tf.io.gfile.makedirs(checkpoint_dpath)
+
+            if self.keep_checkpoints and tf.io.gfile.exists(state_fpath): # Checkpoints kept before resuming
+                tf.io.gfile.copy(state_fpath, os.path.join(manager_dpath, "checkpoint"))
+        else:
+            manager_dpath = worker_checkpoint_dpath(checkpoint_dpath, strategy)
+
+        self.checkpoint_manager = tf.train.CheckpointManager(checkpoint, manager_dpath,
+                max_to_keep=max_to_keep)
+
+    def save(self) -> None:
+        self.sync()
+
+        if self.checkpoint_options is not None:
+            self.checkpoint_manager.save(options=self.checkpoint_options)
+
+            if not self.keep_checkpoints: # Non-chief copies are discarded once written
+                self.checkpoint.sync()
+                tf.io.gfile.rmtree(self.checkpoint_manager.directory)
+
+            return
+
+        # Synchronous: training continues once the variables are serialized in host memory
+        host_fpaths = tf.io.gfile.glob(self.checkpoint_manager.save() + ".*")
+
+        if not self.keep_checkpoints:
+            for host_fpath in host_fpaths:
+                tf.io.gfile.remove(host_fpath)
+
+            return
+
+        kept_prefixes = [ os.path.basename(prefix) for prefix in self.checkpoint_manager.checkpoints ]
+        self.write_thread = threading.Thread(target=self.write_checkpoint,
+                args=(host_fpaths, kept_prefixes))
+        self.write_thread.start()
+
+    def write_checkpoint(self, host_fpaths: list, kept_prefixes: list) -> None:
+        # Copies the host checkpoint files, then the state file, and drops the swept checkpoints.
+        try:
+            for host_fpath in host_fpaths:
+                tf.io.gfile.copy(host_fpath, os.path.join(self.checkpoint_dpath,
+                        os.path.basename(host_fpath)), overwrite=True)
+
+                tf.io.gfile.remove(host_fpath) # Kept on disk from now on
+
+            state_fpath = os.path.join(self.checkpoint_dpath, "checkpoint")
+            tf.io.gfile.copy(os.path.join(self.checkpoint_manager.directory, "checkpoint"),
+                    state_fpath + ".tmp", overwrite=True)
+
+            tf.io.gfile.rename(state_fpath + ".tmp", state_fpath, overwrite=True) # Atomic on local disks
+
+            for fpath in tf.io.gfile.glob(os.path.join(self.checkpoint_dpath, "ckpt-*")):
+                if os.path.basename(fpath).split('.')[0] not in kept_prefixes:
+                    tf.io.gfile.remove(fpath)
+
+        except Exception as error: # Raised by the next <sync>
+            self.write_error = error
+
+    def sync(self) -> None:
+        # Waits for the pending write, raising its error if any.
+        if self.write_thread is not None:
+            self.write_thread.join()
+            self.write_thread = None
+
+        if self.checkpoint_options is not None:
+            self.checkpoint.sync()
+
+        if self.write_error is not None:
+            write_error, self.write_error = self.write_error, None
+            raise write_error
+
+    def close(self) -> None:
+        self.sync()
+
+        if self.checkpoint_options is None: # Only the state file is left in host memory
+            tf.io.gfile.rmtree(self.checkpoint_manager.directory)
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,88 @@
+import os
+import json
+import socket
+import multiprocessing
+import tensorflow as tf
+
+def is_multi_worker(strategy: tf.distribute.Strategy) -> bool:
+    return isinstance(strategy, tf.distribute.MultiWorkerMirroredStrategy) and \
+            strategy.cluster_resolver is not None and \
+            len(strategy.cluster_resolver.cluster_spec().as_dict().get("worker", [])) > 1
+
+def is_chief(strategy: tf.distribute.Strategy) -> bool:
+    # The chief (or worker 0 when there is no chief) writes checkpoints for the cluster.
+    cluster_resolver = getattr(strategy, "cluster_resolver", None)
+
+    if cluster_resolver is None or cluster_resolver.task_type is None:
+        return True
+
+    if cluster_resolver.task_type == "chief":
+        return True
+
+    return cluster_resolver.task_type == "worker" and cluster_resolver.task_id == 0 and \
+            "chief" not in cluster_resolver.cluster_spec().as_dict()
+
+def worker_checkpoint_dpath(checkpoint_dpath: str, strategy: tf.distribute.Strategy) -> str:
+    # Every worker takes part in saving; only the chief's checkpoints are kept in <checkpoint_dpath>.
+    if is_chief(strategy):
+        return checkpoint_dpath
+
+    return os.path.join(checkpoint_dpath, f"worker_{strategy.cluster_resolver.task_id}_temp")
+
+def free_ports(num_ports: int) -> list:
+    sockets = [ socket.socket() for _ in range(num_ports) ]
+
+    for local_socket in sockets:
+        local_socket.bind(("localhost", 0))
+
+    ports = [ local_socket.getsockname()[1] for local_socket in sockets ]
+
+    for local_socket in sockets:
+        local_socket.close()
+
+    return ports
+
+def local_tf_config(num_workers: int, task_id: int, ports: list) -> dict:
+    return {
+        "cluster": { "worker": [ f"localhost:{port}" for port in ports[:num_workers] ] },
+        "task": { "type": "worker", "index": task_id }
+    }
+
+def run_local_worker(tf_config: dict, target: callable, args: tuple, kwargs: dict) -> None:
+    # TF_CONFIG must be set before <target> creates its MultiWorkerMirroredStrategy
+    os.environ["TF_CONFIG"] = json.dumps(tf_config)
+    target(*args, **kwargs)
+
+def launch_local_workers(target: callable, num_workers: int, *args, **kwargs) -> list:
+    """ Runs <target> on <num_workers> local worker processes of one TF cluster.
+
+    <target> must create a tf.distribute.MultiWorkerMirroredStrategy, build
+    the encoder with it (e.g. TensorflowBert(..., strategy=strategy)) and
+    call <train> with the same arguments and seed on every worker.
+
+    Args:
+        target (callable): A picklable function run by every worker.
+        num_workers (int): The number of worker processes.
+    Returns:
+        exit_codes (list): The exit code of each worker.
+    """
+    ports = free_ports(num_workers)
+    context = multiprocessing.get_context("spawn") # TensorFlow runtimes cannot be forked
+
+    workers = [
+        context.Process(target=run_local_worker, args=(
+            local_tf_config(num_workers, task_id, ports), target, args, kwargs
+        ))
+        for task_id in range(num_workers)
+    ]
+
+    for worker in workers:
+        worker.start()
+
+    for worker in workers:
+        worker.join()
+
+    return [ worker.exitcode for worker in workers ]
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,43 @@
+import random
+import pytest
+
+from nlplib.text.extractor import count_n_grams, extract_n_grams_by_pmi, map_n_gram
+from nlplib.text.utility import collapse_text_sequences
+
+def synthetic_text_sequences(num_docs: int = 80, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    vocabulary = [ f"w{idx}" for idx in range(8) ]
+
+    return [
+        [ rng.choices(vocabulary, weights=range(8, 0, -1), k=rng.randint(0, 12))
+        for _ in range(rng.randint(1, 4)) ]
+        for _ in range(num_docs)
+    ]
+
+def nltk_collocation_finder(text_sequences: list, n: int):
+    _, collocation_finder_type = map_n_gram[n]
+    return collocation_finder_type.from_words(collapse_text_sequences(text_sequences))
+
+@pytest.mark.parametrize("n", [ 2, 3, 4 ])
+@pytest.mark.parametrize("shard_size", [ 1, 7, 50, 10_000 ])
+def test_sharded_counts_match_from_words(n: int, shard_size: int):
+    text_sequences = synthetic_text_sequences()
+    collocation_finder = nltk_collocation_finder(text_sequences, n)
+    counts = count_n_grams(text_sequences, n, shard_size=shard_size)
+
+    assert counts.collocation_finder.N == collocation_finder.N
+
+    for attr, freq_dist in counts.freq_dists().items():
+        assert dict(freq_dist) == dict(vars(collocation_finder)[attr]), attr
+
+@pytest.mark.parametrize("n", [ 2, 3, 4 ])
+@pytest.mark.parametrize("shard_size, n_workers", [ (None, None), (13, None), (13, 2) ])
+def test_sharded_pmi_matches_from_words(n: int, shard_size: int, n_workers: int):
+    text_sequences = synthetic_text_sequences()
+    measures_type, _ = map_n_gram[n]
+
+    collocation_finder = nltk_collocation_finder(text_sequences, n)
+    collocation_finder.apply_freq_filter(2)
+
+    assert extract_n_grams_by_pmi(text_sequences, n, 20, min_freq=2, shard_size=shard_size,
+            n_workers=n_workers) == collocation_finder.nbest(measures_type().pmi, 20)
@@ -0,0 +1,10 @@
+from nlplib.text.cleaning import CleaningPipeline
+from nlplib.text.parallel import TextProcessPool
+
+def test_pool_serves_methods_without_nltk_resources():
+    # The default initializer must not break the pool on hosts without NLTK data.
+    pipeline = CleaningPipeline(drop_empty=True).to_lowercase().remove_double_spaces()
+    text_sequences = [ [ "Hello  World", "" ], [ "A  b" ], [ "C" ] ]
+
+    with TextProcessPool(n_workers=2, chunk_size=2) as pool:
+        assert pool.apply(pipeline, text_sequences) == pipeline(text_sequences)
@@ -0,0 +1,39 @@
+from nlplib.text.ragged_sequences import RaggedSequences
+
+def test_concat_empty_chunks():
+    ragged_sequences = RaggedSequences.from_nested([ [ ["x", "y"], ["z"] ], [ ["w"] ] ])
+    concat_sequences = RaggedSequences.concat([ ragged_sequences[:0], ragged_sequences ])
+
+    assert concat_sequences.to_nested() == ragged_sequences.to_nested()
+    assert RaggedSequences.concat([ ragged_sequences[:0] ] * 2).to_nested() == []
+
+def test_concat_partly_empty_chunks():
+    ragged_sequences = RaggedSequences.from_nested([ [], [ ["y"] ], [ [], ["z"] ] ])
+    chunks = [ ragged_sequences[:1], ragged_sequences[1:2], ragged_sequences[2:] ]
+
+    assert RaggedSequences.concat(chunks).to_nested() == [ [], [ ["y"] ], [ [], ["z"] ] ]
+
+def test_map_depth_independent_of_chunk():
+    ragged_sequences = RaggedSequences.from_nested([ [ "a b", None ], [ "c" ], [] ])
+
+    def split_text(text: str) -> list:
+        return None if text is None else text.split()
+
+    chunks = [ ragged_sequences[frm_idx:frm_idx + 1].map(split_text) for frm_idx in range(3) ]
+
+    assert [ chunk.depth for chunk in chunks ] == [ 3, 3, 3 ]
+    assert RaggedSequences.concat(chunks).to_nested() == [ [ [ "a", "b" ], [] ], [ [ "c" ] ], [] ]
+
+def test_concat_deepens_chunks_without_leaves():
+    ragged_sequences = RaggedSequences.from_nested([ [ "a b" ], [ "c" ] ])
+    chunks = [ ragged_sequences[:0].map(str.split), ragged_sequences.map(str.split) ]
+
+    assert RaggedSequences.concat(chunks).to_nested() == [ [ [ "a", "b" ] ], [ [ "c" ] ] ]
+
+def test_collapse_drops_none_leaves():
+    from nlplib.text.utility import collapse_text_sequences
+
+    text_sequences = [ [ "a", None ], [ None, "b" ] ]
+
+    assert collapse_text_sequences(RaggedSequences.from_nested(text_sequences)) == \
+            collapse_text_sequences(text_sequences) == [ "a", "b" ]
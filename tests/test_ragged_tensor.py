@@ -0,0 +1,21 @@
+import numpy as np
+
+from nlplib.text_encoder.base import BaseTextEncoder
+from nlplib.text_encoder.ragged_tensor import padded_tensor
+
+# Float weights of leaves above the last dimension, truncated to 0 by the recursive padded_tensor
+MIXED_DEPTH_TEXTS = [ [ [ [ '', '', 'c' ], 'a', 'c' ] ] ]
+MIXED_DEPTH_WEIGHTS = [ [ [ [ 2., 2., .5 ], .5, 2. ] ] ]
+
+class TextLengthEncoder (BaseTextEncoder):
+    def flat_encode(self, flat_text_tensor: np.ndarray, **kwargs) -> np.ndarray:
+        return np.array([ len(text) + 1. for text in flat_text_tensor ])
+
+def test_mixed_depth_float_weights_keep_precision():
+    weight_tensor = padded_tensor(MIXED_DEPTH_WEIGHTS, pad_value=0, dtype=float)
+
+    np.testing.assert_array_equal(weight_tensor, [ [ [ [ 2., 2., .5 ], [ .5, 0., 0. ], [ 2., 0., 0. ] ] ] ])
+
+def test_mixed_depth_float_weights_encode():
+    # 2 * 1 + 2 * 1 + .5 * 2 + .5 * 2 + 2 * 2; the truncated .5 weight gave 9
+    np.testing.assert_allclose(TextLengthEncoder().encode(MIXED_DEPTH_TEXTS, MIXED_DEPTH_WEIGHTS), [ 10. ])
@@ -0,0 +1,91 @@
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+
+from nlplib.score import polarity_preserving, normalize_scores, rolling_normalize_window, \
+        OnlineScoreNormalizer
+
+@polarity_preserving
+def reference_rolling_normalize_window(target_scores: np.ndarray, min_score: float = 0,
+    max_score: float = 1, window: int = None) -> np.ndarray:
+    # The per-window implementation <rolling_normalize_window> replaced.
+    if window is None:
+        window = max(target_scores.shape[0] // 3, 1)
+
+    concat = pd.concat if isinstance(target_scores, (pd.Index, pd.Series, pd.DataFrame)) \
+            else np.concatenate
+
+    return concat([
+        normalize_scores(target_scores[:window], min_score, max_score), *[
+            normalize_scores(target_scores[t: t + window], min_score, max_score)[-1:]
+            for t in range(1, target_scores.shape[0] - window + 1)
+        ]
+    ], axis=0)
+
+def synthetic_scores(num_scores: int, seed: int, nan: bool = False, ties: bool = False) -> np.ndarray:
+    scores = np.random.default_rng(seed).standard_normal(num_scores)
+
+    scores[0], scores[-1] = 1.5, -1.5 # Both polarities, as <polarity_preserving> requires
+
+    if ties:
+        scores = np.round(scores)
+
+    if nan:
+        scores[num_scores // 2] = np.nan
+
+    return scores
+
+def assert_same_scores(scores: any, reference_scores: any) -> None:
+    if isinstance(reference_scores, (pd.Series, pd.DataFrame)):
+        assert scores.index.equals(reference_scores.index)
+        scores, reference_scores = scores.to_numpy(), reference_scores.to_numpy()
+
+    np.testing.assert_array_equal(scores, reference_scores)
+
+@pytest.mark.parametrize("num_scores, window", [ (3, None), (10, 3), (40, None), (40, 1), (40, 7), (5, 9) ])
+@pytest.mark.parametrize("preserve_polarity", [ False, True ])
+@pytest.mark.parametrize("nan, ties", [ (False, False), (True, False), (False, True) ])
+@pytest.mark.parametrize("container", [
+    lambda scores: scores,
+    lambda scores: pd.Series(scores, index=np.arange(scores.size) * 2 + 5),
+    lambda scores: pd.DataFrame({ "a": scores, "b": scores[::-1] }),
+    lambda scores: scores.reshape(-1, 1) * np.array([ 1, -2, 3 ])
+])
+def test_rolling_normalize_window_matches_reference(num_scores: int, window: int, preserve_polarity: bool,
+    nan: bool, ties: bool, container: callable):
+
+    target_scores = container(synthetic_scores(num_scores, num_scores, nan, ties))
+
+    with warnings.catch_warnings(): # Constant windows divide by zero alike
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        assert_same_scores(
+            rolling_normalize_window(target_scores, -1, 1, window=window, preserve_polarity=preserve_polarity),
+            reference_rolling_normalize_window(target_scores, -1, 1, window=window,
+                    preserve_polarity=preserve_polarity)
+        )
+
+@pytest.mark.parametrize("num_scores, window", [ (3, 4), (4, 4), (40, 1), (40, 7), (60, 25) ])
+@pytest.mark.parametrize("preserve_polarity", [ False, True ])
+@pytest.mark.parametrize("nan, ties", [ (False, False), (True, False), (False, True) ])
+def test_online_normalizer_matches_reference(num_scores: int, window: int, preserve_polarity: bool,
+    nan: bool, ties: bool):
+
+    target_scores = synthetic_scores(num_scores, window, nan, ties)
+    normalizer = OnlineScoreNormalizer(-1, 1, window, preserve_polarity)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        reference_scores = reference_rolling_normalize_window(target_scores, -1, 1, window=window,
+                preserve_polarity=preserve_polarity)
+
+        online_scores = np.concatenate([ *(normalizer.update(score) for score in target_scores),
+                normalizer.flush() ])
+
+        normalizer.reset()
+        batch_scores = np.concatenate([ normalizer.update_many(target_scores), normalizer.flush() ])
+
+    np.testing.assert_array_equal(online_scores, reference_scores)
+    np.testing.assert_array_equal(batch_scores, reference_scores)
@@ -0,0 +1,35 @@
+import pytest
+import numpy as np
+
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("official.nlp")
+
+from nlplib.text_encoder.tensorflow_base import BaseTensorflowTextEncoder
+from nlplib.text_encoder.encoder_reduction.numpy import NumpySegmentReduction
+
+class StubTensorflowEncoder (BaseTensorflowTextEncoder):
+    # Deterministic text length scores, without model weights
+    def trainable_variables(self) -> list:
+        return []
+
+    def flat_encode(self, flat_text_tensor: any, **kwargs) -> tf.Tensor:
+        return tf.cast(tf.strings.length(tf.convert_to_tensor(flat_text_tensor, dtype=tf.string)) + 1,
+                self.dtype)
+
+TEXT_INPUTS = [ [ [ "ab cd", "e" ], [ "fgh" ] ], [ [ "", "x y z" ] ], [ [ "q" ] ] ]
+TEXT_WEIGHTS = [ [ [ 1., 2. ], [ .5 ] ], [ [ 0., 1. ] ], [ [ 3. ] ] ]
+
+@pytest.mark.parametrize("text_weights", [ None, TEXT_WEIGHTS ])
+def test_encode_matches_dense_flat_map_encode(text_weights: list):
+    text_encoder = StubTensorflowEncoder()
+    text_tensor, weight_tensor = text_encoder.pad_inputs(TEXT_INPUTS, text_weights)
+    dense_outputs = text_encoder.reduce_output(text_encoder.flat_map_encode(text_tensor), weight_tensor)
+
+    np.testing.assert_array_equal(text_encoder.encode(TEXT_INPUTS, text_weights), dense_outputs.numpy())
+
+def test_encode_with_numpy_segment_reduction():
+    text_encoder = StubTensorflowEncoder(NumpySegmentReduction("sum"))
+    dense_encoder = StubTensorflowEncoder()
+
+    np.testing.assert_allclose(text_encoder.encode(TEXT_INPUTS, TEXT_WEIGHTS),
+            dense_encoder.encode(TEXT_INPUTS, TEXT_WEIGHTS), rtol=1e-6)
@@ -0,0 +1,22 @@
+import pytest
+
+from nlplib.text.tokenizer import TokenVocabulary, TokenFilter, drop_token_cond, iter_window_tokens
+
+@pytest.mark.parametrize("token_list, delimiter", [
+    ([ "a", "", "c" ], ' '),
+    ([ "", "", "b", "" ], ' '),
+    ([ "", "", "b", "" ], ''),
+    ([ "a", "b" ], ' ')
+])
+@pytest.mark.parametrize("drop_window_token_cond", [
+    drop_token_cond.empty,
+    TokenFilter(drop_token_cond.empty, drop_tokens=[ "a" ])
+])
+def test_vocabulary_windows_match_string_windows(token_list: list, delimiter: str,
+    drop_window_token_cond: callable):
+
+    vocabulary = TokenVocabulary()
+    string_windows = list(iter_window_tokens(token_list, 3, drop_window_token_cond, delimiter))
+    id_windows = list(iter_window_tokens(token_list, 3, drop_window_token_cond, delimiter, vocabulary))
+
+    assert [ delimiter.join(vocabulary.decode(window)) for window in id_windows ] == string_windows